@@ -3,78 +3,335 @@ AI opponent using Negamax with Alpha-Beta pruning.
 """
 
 import random
-from constants import CHECKMATE_SCORE, STALEMATE_SCORE, AI_DEPTH
+import time
+from collections import defaultdict
+from constants import (
+    CHECKMATE_SCORE, STALEMATE_SCORE, AI_DEPTH, MAX_PLY, TT_MAX_ENTRIES, PIECE_VALUES, TYPE_MASK,
+    NULL_MOVE_REDUCTION, NULL_MOVE_MIN_DEPTH, NULL_WINDOW, COLOR_MASK,
+    KNIGHT, QUEEN
+)
 from evaluation import scoreBoard
+from move import SQUARE_MASK, PIECE_MASK, END_SHIFT, MOVED_SHIFT, CAPTURED_SHIFT, CAPTURE_MASK
 
+# Transposition table flags: how the stored score relates to the true value
+TT_EXACT = 0
+TT_LOWER_BOUND = 1  # Search failed high, true score >= stored score
+TT_UPPER_BOUND = 2  # Search failed low, true score <= stored score
 
-def findBestMove(game_state, valid_moves, return_queue):
+# Transposition table: zkey -> (depth, score, flag, best_move)
+TT = {}
+
+# Move ordering priorities (higher is searched first)
+HASH_MOVE_PRIORITY = 1_000_000
+CAPTURE_PRIORITY = 100_000
+KILLER_1_PRIORITY = 90_000
+KILLER_2_PRIORITY = 89_000
+
+# Quiet moves that caused a beta cutoff: two killer slots per ply
+killers = [[None, None] for _ in range(MAX_PLY)]
+# Cutoff counts for quiet moves, keyed by (piece_moved, end_sq)
+history = defaultdict(int)
+
+
+def findBestMove(game_state, valid_moves, return_queue, time_limit=None):
     """
-    Find the best move using Negamax with alpha-beta pruning.
+    Find the best move using iterative deepening Negamax with alpha-beta pruning.
+    
+    Searches depth 1, 2, ... AI_DEPTH in turn. Each iteration fills the
+    transposition table and puts the previous best move first, so deeper
+    iterations prune more.
     
     Args:
         game_state: Current GameState
         valid_moves: List of valid moves
         return_queue: Queue to return the best move
+        time_limit: Optional budget in seconds; no new iteration is started
+            once it has been used up
     """
     global next_move
     next_move = None
+    for slots in killers:
+        slots[0] = slots[1] = None
+    history.clear()
     random.shuffle(valid_moves)
-    findMoveNegaMaxAlphaBeta(
-        game_state, valid_moves, AI_DEPTH,
-        -CHECKMATE_SCORE, CHECKMATE_SCORE,
-        1 if game_state.white_to_move else -1
-    )
+    start_time = time.time()
+    
+    for depth in range(1, AI_DEPTH + 1):
+        findMoveNegaMaxAlphaBeta(
+            game_state, valid_moves, depth,
+            -CHECKMATE_SCORE, CHECKMATE_SCORE,
+            1 if game_state.white_to_move else -1, 0
+        )
+        
+        # Search the principal move first in the next iteration
+        if next_move is not None:
+            valid_moves.remove(next_move)
+            valid_moves.insert(0, next_move)
+        
+        if time_limit is not None and time.time() - start_time >= time_limit:
+            break
+    
     return_queue.put(next_move)
 
 
-def findMoveNegaMaxAlphaBeta(game_state, valid_moves, depth, alpha, beta, turn_multiplier):
+def findMoveNegaMaxAlphaBeta(game_state, valid_moves, depth, alpha, beta, turn_multiplier, ply):
     """
     Negamax algorithm with alpha-beta pruning.
     
+    Positions already searched to at least the current depth are looked up in
+    the transposition table to return early or narrow the alpha-beta window.
+    Null-move pruning skips nodes where even passing the turn fails high, and
+    moves after the first are searched with a zero window (principal
+    variation search), with a full re-search only if one turns out better.
+    
+    Below the root, moves are pseudo-legal (getPseudoLegalMoves): each one is
+    made first and taken back if it leaves the king in check, which is
+    cheaper than full pin and check analysis for every node.
+    
     Args:
         game_state: Current GameState
-        valid_moves: List of valid moves for current position
+        valid_moves: Legal moves at the root, pseudo-legal moves below it
         depth: Current search depth
         alpha: Alpha cutoff value
         beta: Beta cutoff value
         turn_multiplier: 1 for white, -1 for black
+        ply: Distance from the root in half-moves
         
     Returns:
         Float: Score of the position
     """
     global next_move
     
+    alpha_original = alpha
+    
+    # Transposition table probe (never at the root, which must pick a move)
+    entry = TT.get(game_state.zkey)
+    hash_move = entry[3] if entry is not None else None
+    if entry is not None and entry[0] >= depth and ply != 0:
+        entry_score = entry[1]
+        if entry[2] == TT_EXACT:
+            return entry_score
+        elif entry[2] == TT_LOWER_BOUND:
+            alpha = max(alpha, entry_score)
+        else:
+            beta = min(beta, entry_score)
+        if alpha >= beta:
+            return entry_score
+    
     if depth == 0:
-        return turn_multiplier * scoreBoard(game_state)
+        return quiescence(game_state, valid_moves, alpha, beta, turn_multiplier, ply)
+    
+    # Read before any child search: children overwrite game_state.in_check
+    in_check = game_state.in_check
+    
+    # Null-move pruning: if the opponent can't reach beta even with a free move,
+    # a real move would fail high too. Skipped in check and in pawn endings,
+    # where zugzwang makes passing better than any move.
+    if depth >= NULL_MOVE_MIN_DEPTH and ply != 0 and not in_check and hasNonPawnMaterial(game_state):
+        game_state.makeNullMove()
+        score = -findMoveNegaMaxAlphaBeta(
+            game_state, game_state.getPseudoLegalMoves(game_state.move_buffers[ply + 1]),
+            depth - 1 - NULL_MOVE_REDUCTION, -beta, -beta + NULL_WINDOW, -turn_multiplier, ply + 1
+        )
+        game_state.undoNullMove()
+        if score >= beta:
+            return beta
     
     max_score = -CHECKMATE_SCORE
+    best_move = None
+    legal_move_found = False
     
+    # Bind hot methods once instead of looking them up for every move
+    make_move = game_state.makeMove
+    undo_move = game_state.undoMove
+    king_left_in_check = game_state.kingLeftInCheck
+    get_pseudo_legal_moves = game_state.getPseudoLegalMoves
+    # Replies are generated into the next ply's buffer; valid_moves is this ply's
+    next_buffer = game_state.move_buffers[ply + 1]
+    
+    orderMoves(valid_moves, hash_move, ply)
     for move in valid_moves:
-        game_state.makeMove(move)
-        next_moves = game_state.getValidMoves()
+        make_move(move)
+        if king_left_in_check(in_check):
+            undo_move()
+            continue  # Illegal pseudo-legal move
+        next_moves = get_pseudo_legal_moves(next_buffer)
         
-        # Recursive call with negated alpha-beta and opposite turn multiplier
-        score = -findMoveNegaMaxAlphaBeta(
-            game_state, next_moves, depth - 1,
-            -beta, -alpha, -turn_multiplier
-        )
+        # Recursive call with negated alpha-beta and opposite turn multiplier.
+        # Principal variation search: only the first move gets the full window,
+        # the rest are expected to fail low and are first tried with a zero window.
+        if not legal_move_found:
+            score = -findMoveNegaMaxAlphaBeta(
+                game_state, next_moves, depth - 1,
+                -beta, -alpha, -turn_multiplier, ply + 1
+            )
+        else:
+            score = -findMoveNegaMaxAlphaBeta(
+                game_state, next_moves, depth - 1,
+                -alpha - NULL_WINDOW, -alpha, -turn_multiplier, ply + 1
+            )
+            if alpha < score < beta:
+                # Beat the first move after all: re-search with the full window.
+                # Regenerate the replies, which also resets in_check for the child.
+                score = -findMoveNegaMaxAlphaBeta(
+                    game_state, get_pseudo_legal_moves(next_buffer), depth - 1,
+                    -beta, -alpha, -turn_multiplier, ply + 1
+                )
+        legal_move_found = True
         
         if score > max_score:
             max_score = score
-            if depth == AI_DEPTH:
+            best_move = move
+            if ply == 0:
                 next_move = move
         
-        game_state.undoMove()
+        undo_move()
         
         # Alpha-beta pruning
         if max_score > alpha:
             alpha = max_score
         if alpha >= beta:
+            # Remember quiet moves that refute this position
+            if not move & CAPTURE_MASK:
+                if move != killers[ply][0]:
+                    killers[ply][1] = killers[ply][0]
+                    killers[ply][0] = move
+                history[(move >> MOVED_SHIFT & PIECE_MASK, move >> END_SHIFT & SQUARE_MASK)] += depth * depth
             break  # Beta cutoff
     
+    # No legal move: checkmate or stalemate
+    if not legal_move_found:
+        max_score = -CHECKMATE_SCORE if in_check else STALEMATE_SCORE
+    
+    # Store the result, remembering which side of the window it fell on
+    if max_score <= alpha_original:
+        flag = TT_UPPER_BOUND
+    elif max_score >= beta:
+        flag = TT_LOWER_BOUND
+    else:
+        flag = TT_EXACT
+    if len(TT) >= TT_MAX_ENTRIES:
+        TT.clear()
+    TT[game_state.zkey] = (depth, max_score, flag, best_move)
+    
     return max_score
 
 
+def hasNonPawnMaterial(game_state):
+    """Check whether the side to move has any knight, bishop, rook or queen."""
+    ally_color = game_state.ally_color
+    for piece in game_state.board:
+        if piece & COLOR_MASK == ally_color and KNIGHT <= piece & TYPE_MASK <= QUEEN:
+            return True
+    return False
+
+
+def quiescence(game_state, valid_moves, alpha, beta, turn_multiplier, ply):
+    """
+    Extend the search along capture sequences until the position is quiet.
+    
+    The side to move may "stand pat" on the static evaluation, or try a
+    capture to improve on it. This avoids misjudging positions in the middle
+    of an exchange at the search horizon. A position in check with no legal
+    reply is scored as checkmate.
+    
+    Args:
+        game_state: Current GameState
+        valid_moves: Pseudo-legal moves for current position
+        alpha: Alpha cutoff value
+        beta: Beta cutoff value
+        turn_multiplier: 1 for white, -1 for black
+        ply: Distance from the root in half-moves
+        
+    Returns:
+        Float: Score of the position
+    """
+    # Moves are pseudo-legal, so mate has to be confirmed by trying them
+    if game_state.in_check and not hasLegalMove(game_state, valid_moves):
+        return -CHECKMATE_SCORE
+    
+    stand_pat = turn_multiplier * scoreBoard(game_state)
+    if stand_pat >= beta:
+        return beta
+    if stand_pat > alpha:
+        alpha = stand_pat
+    
+    captures = [move for move in valid_moves if move & CAPTURE_MASK]
+    if not captures:
+        return alpha
+    captures.sort(key=captureValue, reverse=True)
+    
+    # Children overwrite game_state.in_check, so keep this node's value
+    in_check = game_state.in_check
+    make_move = game_state.makeMove
+    undo_move = game_state.undoMove
+    king_left_in_check = game_state.kingLeftInCheck
+    get_pseudo_legal_moves = game_state.getPseudoLegalMoves
+    next_buffer = game_state.move_buffers[ply + 1]
+    for move in captures:
+        make_move(move)
+        if king_left_in_check(in_check):
+            undo_move()
+            continue  # Illegal pseudo-legal move
+        score = -quiescence(game_state, get_pseudo_legal_moves(next_buffer), -beta, -alpha, -turn_multiplier, ply + 1)
+        undo_move()
+        
+        if score >= beta:
+            return beta
+        if score > alpha:
+            alpha = score
+    
+    return alpha
+
+
+def hasLegalMove(game_state, moves):
+    """Check whether any of the pseudo-legal moves doesn't leave the king in check."""
+    make_move = game_state.makeMove
+    undo_move = game_state.undoMove
+    king_left_in_check = game_state.kingLeftInCheck
+    for move in moves:
+        make_move(move)
+        legal = not king_left_in_check()
+        undo_move()
+        if legal:
+            return True
+    return False
+
+
+def captureValue(move):
+    """MVV-LVA value of a capture: most valuable victim, least valuable attacker."""
+    return 10 * PIECE_VALUES[move >> CAPTURED_SHIFT & TYPE_MASK] - PIECE_VALUES[move >> MOVED_SHIFT & TYPE_MASK]
+
+
+def orderMoves(valid_moves, hash_move, ply):
+    """
+    Sort moves in place so the most promising are searched first.
+    
+    Order: transposition table move, captures by MVV-LVA (most valuable
+    victim, least valuable attacker), killer moves, then quiet moves by
+    history score.
+    
+    Args:
+        valid_moves: List of valid moves to sort
+        hash_move: Best move stored in the transposition table, or None
+        ply: Distance from the root, selects the killer slots
+    """
+    killer_1, killer_2 = killers[ply]
+    
+    def movePriority(move):
+        if move == hash_move:
+            return HASH_MOVE_PRIORITY
+        if move & CAPTURE_MASK:
+            return CAPTURE_PRIORITY + captureValue(move)
+        if move == killer_1:
+            return KILLER_1_PRIORITY
+        if move == killer_2:
+            return KILLER_2_PRIORITY
+        return history[(move >> MOVED_SHIFT & PIECE_MASK, move >> END_SHIFT & SQUARE_MASK)]
+    
+    valid_moves.sort(key=movePriority, reverse=True)
+
+
 def findRandomMove(valid_moves):
     """
     Pick a random valid move (fallback).
@@ -4,13 +4,31 @@ Manages game state, move validation, and game logic.
 """
 
 from constants import (
-    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR,
-    PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING,
+    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, COLOR_MASK, TYPE_MASK,
+    PAWN, ROOK, KNIGHT, QUEEN, KING,
+    WKS, WQS, BKS, BQS, ALL_CASTLING_RIGHTS,
+    CHECKMATE_SCORE, STALEMATE_SCORE, MAX_PLY, MOVE_CACHE_MAX_ENTRIES,
     INITIAL_BOARD, WHITE_KING_START, BLACK_KING_START
 )
-from move import Move, CastleRights
+from move import (
+    packMove, SQUARE_MASK, PIECE_MASK, END_SHIFT, MOVED_SHIFT, CAPTURED_SHIFT,
+    ENPASSANT_FLAG, CASTLE_FLAG, PROMOTION_FLAG
+)
+from itertools import compress
 import piece_moves
 import check_detection as cd
+import zobrist
+from evaluation import SQUARE_SCORES, computeScore
+
+# Pseudo-legal moves by position: zkey -> (in_check, moves). Module level so every
+# GameState in the AI process shares it.
+MOVE_CACHE = {}
+
+# board.translate(PIECE_FLAGS[color]) gives a 1 for every square holding a piece of
+# that color, so the side's squares can be picked out without a Python-level loop
+PIECE_FLAGS = {color: bytes(1 if piece & COLOR_MASK == color else 0 for piece in range(256))
+               for color in (WHITE_COLOR, BLACK_COLOR)}
+SQUARES = range(BOARD_SIZE * BOARD_SIZE)
 
 
 class GameState:
@@ -21,20 +39,13 @@ class GameState:
     
     def __init__(self):
         """Initialize a new chess game with standard starting position."""
-        self.board = [row[:] for row in INITIAL_BOARD]  # Deep copy initial board
-        
-        # Map piece types to their movement functions
-        self.moveFunctions = {
-            PAWN: piece_moves.getPawnMoves,
-            ROOK: piece_moves.getRookMoves,
-            KNIGHT: piece_moves.getKnightMoves,
-            BISHOP: piece_moves.getBishopMoves,
-            QUEEN: piece_moves.getQueenMoves,
-            KING: piece_moves.getKingMoves
-        }
+        self.board = INITIAL_BOARD[:]  # Flat copy: square index = row * BOARD_SIZE + col
         
         # Game state tracking
         self.white_to_move = True
+        # Colour bits of the side to move and its opponent, swapped with every turn
+        self.ally_color = WHITE_COLOR
+        self.enemy_color = BLACK_COLOR
         self.move_log = []
         self.white_king_location = WHITE_KING_START
         self.black_king_location = BLACK_KING_START
@@ -43,9 +54,11 @@ class GameState:
         self.checkmate = False
         self.stalemate = False
         self.in_check = False
+        # Score of a finished game (white positive), None while moves remain
+        self.terminal_score = None
         
         # Check/pin tracking
-        self.pins = []
+        self.pins_by_square = {}  # Square of each pinned piece -> mask of allowed ray directions
         self.checks = []
         
         # En passant tracking
@@ -53,15 +66,20 @@ class GameState:
         self.enpassant_possible_log = [self.enpassant_possible]
         
         # Castling rights tracking
-        self.current_castling_rights = CastleRights(True, True, True, True)
-        self.castle_rights_log = [
-            CastleRights(
-                self.current_castling_rights.wks,
-                self.current_castling_rights.bks,
-                self.current_castling_rights.wqs,
-                self.current_castling_rights.bqs
-            )
-        ]
+        # Castling rights are a WKS | WQS | BKS | BQS bit mask, so the log holds plain ints
+        self.current_castling_rights = ALL_CASTLING_RIGHTS
+        self.castle_rights_log = [self.current_castling_rights]
+        
+        # Zobrist position key, updated incrementally in makeMove
+        self.zkey = zobrist.computeHash(self)
+        self.zkey_log = []
+        
+        # Material + positional score (white positive), updated incrementally in makeMove
+        self.score = computeScore(self.board)
+        self.score_log = []
+        
+        # One reusable move list per search ply, filled by getPseudoLegalMoves through `out`
+        self.move_buffers = [[] for _ in range(MAX_PLY)]
 
     def makeMove(self, move):
         """
@@ -69,55 +87,89 @@ class GameState:
         Updates board state, move log, king location, and special move flags.
         
         Args:
-            move: Move object to execute
+            move: Packed move to execute (see move.packMove)
         """
+        start_sq = move & SQUARE_MASK
+        end_sq = move >> END_SHIFT & SQUARE_MASK
+        piece_moved = move >> MOVED_SHIFT & PIECE_MASK
+        piece_captured = move >> CAPTURED_SHIFT & PIECE_MASK
+        
+        # Bind the key tables once; the zobrist.castleKey/enpassantKey
+        # helpers are inlined below to save the calls on every move
+        piece_keys = zobrist.PIECE_KEYS
+        enpassant_keys = zobrist.ENPASSANT_KEYS
+        self.zkey_log.append(self.zkey)
+        zkey = self.zkey ^ zobrist.SIDE_KEY
+        if self.enpassant_possible:
+            zkey ^= enpassant_keys[self.enpassant_possible[1]]
+        castling_rights = self.current_castling_rights
+        
+        board = self.board
+        self.score_log.append(self.score)
+        score = self.score - SQUARE_SCORES[piece_moved << 6 | start_sq]
+        
         # Move the piece
-        self.board[move.start_row][move.start_col] = EMPTY_SQUARE
-        self.board[move.end_row][move.end_col] = move.piece_moved
+        board[start_sq] = EMPTY_SQUARE
+        board[end_sq] = piece_moved
         self.move_log.append(move)
         self.white_to_move = not self.white_to_move
+        self.ally_color, self.enemy_color = self.enemy_color, self.ally_color
         
         # Update king location if it moved
-        if move.piece_moved == WHITE_COLOR + KING:
-            self.white_king_location = (move.end_row, move.end_col)
-        elif move.piece_moved == BLACK_COLOR + KING:
-            self.black_king_location = (move.end_row, move.end_col)
+        if piece_moved == WHITE_COLOR + KING:
+            self.white_king_location = (end_sq >> 3, end_sq & 7)
+        elif piece_moved == BLACK_COLOR + KING:
+            self.black_king_location = (end_sq >> 3, end_sq & 7)
         
         # Handle pawn promotion (always promote to queen for AI)
-        if move.is_pawn_promotion:
-            self.board[move.end_row][move.end_col] = move.piece_moved[0] + QUEEN
+        if move & PROMOTION_FLAG:
+            board[end_sq] = (piece_moved & COLOR_MASK) | QUEEN
         
         # Handle en passant capture
-        if move.is_enpassant_move:
-            self.board[move.start_row][move.end_col] = EMPTY_SQUARE
+        if move & ENPASSANT_FLAG:
+            captured_sq = (start_sq & ~7) | (end_sq & 7)  # Start row, end column
+            board[captured_sq] = EMPTY_SQUARE
+            zkey ^= piece_keys[piece_captured][captured_sq]
+            score -= SQUARE_SCORES[piece_captured << 6 | captured_sq]
+        elif piece_captured != EMPTY_SQUARE:
+            zkey ^= piece_keys[piece_captured][end_sq]
+            score -= SQUARE_SCORES[piece_captured << 6 | end_sq]
+        
+        zkey ^= piece_keys[piece_moved][start_sq]
+        zkey ^= piece_keys[board[end_sq]][end_sq]
+        score += SQUARE_SCORES[board[end_sq] << 6 | end_sq]
         
         # Update en passant availability
-        if move.piece_moved[1] == PAWN and abs(move.start_row - move.end_row) == 2:
-            self.enpassant_possible = ((move.start_row + move.end_row) // 2, move.start_col)
+        if piece_moved & TYPE_MASK == PAWN and abs(start_sq - end_sq) == 2 * BOARD_SIZE:
+            self.enpassant_possible = ((start_sq + end_sq) >> 4, start_sq & 7)
         else:
             self.enpassant_possible = ()
         
         # Handle castling
-        if move.is_castle_move:
-            if move.end_col - move.start_col == 2:  # Kingside castle
-                self.board[move.end_row][move.end_col - 1] = self.board[move.end_row][move.end_col + 1]
-                self.board[move.end_row][move.end_col + 1] = EMPTY_SQUARE
+        if move & CASTLE_FLAG:
+            if end_sq - start_sq == 2:  # Kingside castle
+                rook_from, rook_to = end_sq + 1, end_sq - 1
             else:  # Queenside castle
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 2]
-                self.board[move.end_row][move.end_col - 2] = EMPTY_SQUARE
+                rook_from, rook_to = end_sq - 2, end_sq + 1
+            rook = board[rook_from]
+            board[rook_to] = rook
+            board[rook_from] = EMPTY_SQUARE
+            zkey ^= piece_keys[rook][rook_from]
+            zkey ^= piece_keys[rook][rook_to]
+            score += SQUARE_SCORES[rook << 6 | rook_to] - SQUARE_SCORES[rook << 6 | rook_from]
         
         self.enpassant_possible_log.append(self.enpassant_possible)
         
         # Update castling rights
         self.updateCastleRights(move)
-        self.castle_rights_log.append(
-            CastleRights(
-                self.current_castling_rights.wks,
-                self.current_castling_rights.bks,
-                self.current_castling_rights.wqs,
-                self.current_castling_rights.bqs
-            )
-        )
+        self.castle_rights_log.append(self.current_castling_rights)
+        
+        if self.current_castling_rights != castling_rights:
+            zkey ^= zobrist.CASTLE_KEYS[castling_rights] ^ zobrist.CASTLE_KEYS[self.current_castling_rights]
+        if self.enpassant_possible:
+            zkey ^= enpassant_keys[self.enpassant_possible[1]]
+        self.zkey = zkey
+        self.score = score
 
     def undoMove(self):
         """
@@ -127,20 +179,29 @@ class GameState:
             return
         
         move = self.move_log.pop()
-        self.board[move.start_row][move.start_col] = move.piece_moved
-        self.board[move.end_row][move.end_col] = move.piece_captured
+        start_sq = move & SQUARE_MASK
+        end_sq = move >> END_SHIFT & SQUARE_MASK
+        piece_moved = move >> MOVED_SHIFT & PIECE_MASK
+        piece_captured = move >> CAPTURED_SHIFT & PIECE_MASK
+        
+        self.zkey = self.zkey_log.pop()
+        self.score = self.score_log.pop()
+        board = self.board
+        board[start_sq] = piece_moved
+        board[end_sq] = piece_captured
         self.white_to_move = not self.white_to_move
+        self.ally_color, self.enemy_color = self.enemy_color, self.ally_color
         
         # Restore king location
-        if move.piece_moved == WHITE_COLOR + KING:
-            self.white_king_location = (move.start_row, move.start_col)
-        elif move.piece_moved == BLACK_COLOR + KING:
-            self.black_king_location = (move.start_row, move.start_col)
+        if piece_moved == WHITE_COLOR + KING:
+            self.white_king_location = (start_sq >> 3, start_sq & 7)
+        elif piece_moved == BLACK_COLOR + KING:
+            self.black_king_location = (start_sq >> 3, start_sq & 7)
         
         # Restore en passant capture
-        if move.is_enpassant_move:
-            self.board[move.end_row][move.end_col] = EMPTY_SQUARE
-            self.board[move.start_row][move.end_col] = move.piece_captured
+        if move & ENPASSANT_FLAG:
+            board[end_sq] = EMPTY_SQUARE
+            board[(start_sq & ~7) | (end_sq & 7)] = piece_captured
         
         self.enpassant_possible_log.pop()
         self.enpassant_possible = self.enpassant_possible_log[-1]
@@ -150,16 +211,37 @@ class GameState:
         self.current_castling_rights = self.castle_rights_log[-1]
         
         # Restore castle move
-        if move.is_castle_move:
-            if move.end_col - move.start_col == 2:  # Kingside
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 1]
-                self.board[move.end_row][move.end_col - 1] = EMPTY_SQUARE
+        if move & CASTLE_FLAG:
+            if end_sq - start_sq == 2:  # Kingside
+                board[end_sq + 1] = board[end_sq - 1]
+                board[end_sq - 1] = EMPTY_SQUARE
             else:  # Queenside
-                self.board[move.end_row][move.end_col - 2] = self.board[move.end_row][move.end_col + 1]
-                self.board[move.end_row][move.end_col + 1] = EMPTY_SQUARE
+                board[end_sq - 2] = board[end_sq + 1]
+                board[end_sq + 1] = EMPTY_SQUARE
         
         self.checkmate = False
         self.stalemate = False
+        self.terminal_score = None
+
+    def makeNullMove(self):
+        """
+        Pass the turn without moving a piece (used by null-move pruning).
+        Only the side to move, en passant square and position key change.
+        """
+        self.zkey_log.append(self.zkey)
+        self.zkey ^= zobrist.SIDE_KEY ^ zobrist.enpassantKey(self.enpassant_possible)
+        self.enpassant_possible = ()
+        self.enpassant_possible_log.append(self.enpassant_possible)
+        self.white_to_move = not self.white_to_move
+        self.ally_color, self.enemy_color = self.enemy_color, self.ally_color
+
+    def undoNullMove(self):
+        """Undo a pass made with makeNullMove."""
+        self.zkey = self.zkey_log.pop()
+        self.enpassant_possible_log.pop()
+        self.enpassant_possible = self.enpassant_possible_log[-1]
+        self.white_to_move = not self.white_to_move
+        self.ally_color, self.enemy_color = self.enemy_color, self.ally_color
 
     def updateCastleRights(self, move):
         """
@@ -167,63 +249,69 @@ class GameState:
         Castling rights are lost when king/rook moves or rook is captured.
         
         Args:
-            move: Move object that was just executed
+            move: Packed move that was just executed
         """
+        start_sq = move & SQUARE_MASK
+        end_sq = move >> END_SHIFT & SQUARE_MASK
+        piece_moved = move >> MOVED_SHIFT & PIECE_MASK
+        piece_captured = move >> CAPTURED_SHIFT & PIECE_MASK
+        
         # King captures rook
-        if move.piece_captured == WHITE_COLOR + ROOK:
-            if move.end_col == 0:
-                self.current_castling_rights.wqs = False
-            elif move.end_col == 7:
-                self.current_castling_rights.wks = False
-        elif move.piece_captured == BLACK_COLOR + ROOK:
-            if move.end_col == 0:
-                self.current_castling_rights.bqs = False
-            elif move.end_col == 7:
-                self.current_castling_rights.bks = False
+        if piece_captured == WHITE_COLOR + ROOK:
+            if end_sq & 7 == 0:
+                self.current_castling_rights &= ~WQS
+            elif end_sq & 7 == 7:
+                self.current_castling_rights &= ~WKS
+        elif piece_captured == BLACK_COLOR + ROOK:
+            if end_sq & 7 == 0:
+                self.current_castling_rights &= ~BQS
+            elif end_sq & 7 == 7:
+                self.current_castling_rights &= ~BKS
         
         # King moves
-        if move.piece_moved == WHITE_COLOR + KING:
-            self.current_castling_rights.wqs = False
-            self.current_castling_rights.wks = False
-        elif move.piece_moved == BLACK_COLOR + KING:
-            self.current_castling_rights.bqs = False
-            self.current_castling_rights.bks = False
+        if piece_moved == WHITE_COLOR + KING:
+            self.current_castling_rights &= ~WQS
+            self.current_castling_rights &= ~WKS
+        elif piece_moved == BLACK_COLOR + KING:
+            self.current_castling_rights &= ~BQS
+            self.current_castling_rights &= ~BKS
         
         # Rook moves
-        elif move.piece_moved == WHITE_COLOR + ROOK:
-            if move.start_row == 7:
-                if move.start_col == 0:
-                    self.current_castling_rights.wqs = False
-                elif move.start_col == 7:
-                    self.current_castling_rights.wks = False
-        elif move.piece_moved == BLACK_COLOR + ROOK:
-            if move.start_row == 0:
-                if move.start_col == 0:
-                    self.current_castling_rights.bqs = False
-                elif move.start_col == 7:
-                    self.current_castling_rights.bks = False
+        elif piece_moved == WHITE_COLOR + ROOK:
+            if start_sq >> 3 == 7:
+                if start_sq & 7 == 0:
+                    self.current_castling_rights &= ~WQS
+                elif start_sq & 7 == 7:
+                    self.current_castling_rights &= ~WKS
+        elif piece_moved == BLACK_COLOR + ROOK:
+            if start_sq >> 3 == 0:
+                if start_sq & 7 == 0:
+                    self.current_castling_rights &= ~BQS
+                elif start_sq & 7 == 7:
+                    self.current_castling_rights &= ~BKS
 
     def checkForPinsAndChecks(self):
         """Wrapper for check detection - updates game state and returns results."""
-        self.in_check, self.pins, self.checks = cd.checkForPinsAndChecks(self)
-        return self.in_check, self.pins, self.checks
+        self.in_check, self.pins_by_square, self.checks = cd.checkForPinsAndChecks(self)
+        return self.in_check, self.pins_by_square, self.checks
 
-    def getValidMoves(self):
+    def getValidMoves(self, out=None):
         """
         Get all legal moves considering pins and checks.
         Filters out moves that would leave the king in check.
         
+        Args:
+            out: Optional list to fill (cleared first) instead of allocating
+                a new one, e.g. one of move_buffers during search
+        
         Returns:
-            List of valid Move objects
+            List of valid moves, packed as ints (see move.packMove)
         """
-        temp_castle_rights = CastleRights(
-            self.current_castling_rights.wks,
-            self.current_castling_rights.bks,
-            self.current_castling_rights.wqs,
-            self.current_castling_rights.bqs
-        )
-        
-        moves = []
+        if out is None:
+            moves = []
+        else:
+            moves = out
+            moves.clear()
         self.checkForPinsAndChecks()
         
         if self.white_to_move:
@@ -233,33 +321,36 @@ class GameState:
         
         if self.in_check:
             if len(self.checks) == 1:  # Single check - can block or move king
-                moves = self.getAllPossibleMoves()
+                self.getAllPossibleMoves(moves)
                 
                 check = self.checks[0]
                 check_row, check_col = check[0], check[1]
-                piece_checking = self.board[check_row][check_col]
+                piece_checking = self.board[check_row * BOARD_SIZE + check_col]
                 valid_squares = []
                 
                 # Knight checks must be captured or king moves
-                if piece_checking[1] == KNIGHT:
-                    valid_squares = [(check_row, check_col)]
+                if piece_checking & TYPE_MASK == KNIGHT:
+                    valid_squares = [check_row * BOARD_SIZE + check_col]
                 else:
                     # Block the check
                     for i in range(1, 8):
-                        valid_square = (king_row + check[2] * i, king_col + check[3] * i)
+                        valid_square = (king_row + check[2] * i) * BOARD_SIZE + king_col + check[3] * i
                         valid_squares.append(valid_square)
-                        if valid_square == (check_row, check_col):
+                        if valid_square == check_row * BOARD_SIZE + check_col:
                             break
                 
-                # Remove moves that don't block or capture
-                for i in range(len(moves) - 1, -1, -1):
-                    if moves[i].piece_moved[1] != KING:
-                        if (moves[i].end_row, moves[i].end_col) not in valid_squares:
-                            moves.remove(moves[i])
+                # Keep only king moves and moves that block or capture (in place, so
+                # a caller's buffer stays the same list). En passant captures land
+                # beside the checker but were already tested against the check.
+                valid_squares = set(valid_squares)
+                moves[:] = [move for move in moves
+                            if move >> MOVED_SHIFT & TYPE_MASK == KING
+                            or move >> END_SHIFT & SQUARE_MASK in valid_squares
+                            or move & ENPASSANT_FLAG]
             else:  # Double check - only king moves
                 self.getKingMoves(king_row, king_col, moves)
         else:  # Not in check
-            moves = self.getAllPossibleMoves()
+            self.getAllPossibleMoves(moves)
             if self.white_to_move:
                 self.getCastleMoves(self.white_king_location[0], self.white_king_location[1], moves)
             else:
@@ -267,17 +358,101 @@ class GameState:
         
         # Determine game status
         if not moves:
-            if self.inCheck():
+            if self.in_check:
                 self.checkmate = True
+                self.terminal_score = -CHECKMATE_SCORE if self.white_to_move else CHECKMATE_SCORE
             else:
                 self.stalemate = True
+                self.terminal_score = STALEMATE_SCORE
         else:
             self.checkmate = False
             self.stalemate = False
+            self.terminal_score = None
+        
+        return moves
+
+    def getPseudoLegalMoves(self, out=None):
+        """
+        Get moves without the pin and check analysis of getValidMoves.
+        
+        Used inside the search: a move may leave the king in check, so after
+        making it the caller must test kingLeftInCheck() and take it back if
+        so. Castling and en passant captures are still fully checked (the
+        latter by piece_moves._addEnPassantIfValid). Sets in_check with a
+        single attack test on the king square.
+        
+        Results are cached by zkey in MOVE_CACHE, so positions reached again
+        through transpositions or a later iterative deepening pass copy their
+        moves instead of generating them.
+        
+        Args:
+            out: Optional list to fill (cleared first) instead of allocating
+                a new one
+        
+        Returns:
+            List of pseudo-legal moves, packed as ints (see move.packMove)
+        """
+        if out is None:
+            moves = []
+        else:
+            moves = out
+            moves.clear()
+        
+        if self.white_to_move:
+            king_row, king_col = self.white_king_location
+        else:
+            king_row, king_col = self.black_king_location
+        
+        # No pin restrictions: illegal moves are rejected after they are made
+        self.pins_by_square = {}
+        self.checks = []
+        self.terminal_score = None
         
-        self.current_castling_rights = temp_castle_rights
+        cached = MOVE_CACHE.get(self.zkey)
+        if cached is not None:
+            self.in_check = cached[0]
+            moves.extend(cached[1])
+            return moves
+        
+        self.in_check = self.inCheck()
+        self.getAllPossibleMoves(moves, piece_moves.PSEUDO_LEGAL_MOVE_FUNCTIONS)
+        self.getCastleMoves(king_row, king_col, moves)
+        
+        if len(MOVE_CACHE) >= MOVE_CACHE_MAX_ENTRIES:
+            MOVE_CACHE.clear()
+        MOVE_CACHE[self.zkey] = (self.in_check, tuple(moves))
         return moves
 
+    def kingLeftInCheck(self, was_in_check=True):
+        """
+        Determine if the move just made left the mover's own king attacked.
+        
+        A move by a side not in check can only expose its king if the king
+        itself moved, the piece left a line through the king (it was pinned),
+        or it was an en passant capture, which empties a second square. For
+        other moves only the ray from the king through the start square is
+        scanned, instead of testing the king square for every attacker.
+        
+        Args:
+            was_in_check: Whether the mover was in check before the move;
+                pass False only if known, e.g. the in_check of the node
+        """
+        if self.white_to_move:
+            king_row, king_col = self.black_king_location
+        else:
+            king_row, king_col = self.white_king_location
+        
+        if not was_in_check:
+            move = self.move_log[-1]
+            if move >> MOVED_SHIFT & TYPE_MASK != KING and not move & ENPASSANT_FLAG:
+                king_sq = king_row * BOARD_SIZE + king_col
+                direction_index = cd.RAY_INDEX[king_sq][move & SQUARE_MASK]
+                if direction_index < 0:
+                    return False  # Start square not on a line through the king
+                return cd.isAttackedAlongRay(self.board, king_sq, direction_index, self.ally_color)
+        
+        return cd.isSquareAttacked(self.board, king_row, king_col, self.ally_color)
+
     def inCheck(self):
         """Determine if the current player's king is in check."""
         if self.white_to_move:
@@ -289,58 +464,66 @@ class GameState:
         """
         Determine if a square is under attack by opponent.
         """
-        self.white_to_move = not self.white_to_move
-        opponents_moves = self.getAllPossibleMoves()
-        self.white_to_move = not self.white_to_move
-        
-        for move in opponents_moves:
-            if move.end_row == row and move.end_col == col:
-                return True
-        return False
+        return cd.isSquareAttacked(self.board, row, col, self.enemy_color)
 
-    def getAllPossibleMoves(self):
+    def getAllPossibleMoves(self, moves=None, move_functions=piece_moves.MOVE_FUNCTIONS):
         """
         Get all possible moves without considering checks.
+        
+        Args:
+            moves: Optional list to append the moves to
+            move_functions: Generators indexed by piece code (color | type)
         """
-        moves = []
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                turn = self.board[row][col][0]
-                if (turn == WHITE_COLOR and self.white_to_move) or \
-                   (turn == BLACK_COLOR and not self.white_to_move):
-                    piece = self.board[row][col][1]
-                    self.moveFunctions[piece](self, row, col, moves)
+        if moves is None:
+            moves = []
+        board = self.board
+        # Only the side's own squares, selected in C by translate and compress
+        for square in compress(SQUARES, board.translate(PIECE_FLAGS[self.ally_color])):
+            move_functions[board[square]](self, square, moves)
         return moves
 
     def getKingMoves(self, row, col, moves):
         """Get king moves."""
-        piece_moves.getKingMoves(self, row, col, moves)
+        piece_moves.getKingMoves(self, row * BOARD_SIZE + col, moves)
 
     def getCastleMoves(self, row, col, moves):
         """
         Generate castling moves if available.
+        
+        The caller must set in_check for the current position first (getValidMoves
+        and getPseudoLegalMoves both do); only the squares the king passes
+        through are tested for attacks here.
         """
-        if self.squareUnderAttack(row, col):
+        if self.in_check:
             return  # Can't castle while in check
         
-        if (self.white_to_move and self.current_castling_rights.wks) or \
-           (not self.white_to_move and self.current_castling_rights.bks):
-            self._getKingsideCastleMoves(row, col, moves)
+        if self.white_to_move:
+            kingside, queenside, enemy_color = WKS, WQS, BLACK_COLOR
+        else:
+            kingside, queenside, enemy_color = BKS, BQS, WHITE_COLOR
+        
+        if self.current_castling_rights & kingside:
+            self._getKingsideCastleMoves(row, col, moves, enemy_color)
         
-        if (self.white_to_move and self.current_castling_rights.wqs) or \
-           (not self.white_to_move and self.current_castling_rights.bqs):
-            self._getQueensideCastleMoves(row, col, moves)
+        if self.current_castling_rights & queenside:
+            self._getQueensideCastleMoves(row, col, moves, enemy_color)
 
-    def _getKingsideCastleMoves(self, row, col, moves):
+    def _getKingsideCastleMoves(self, row, col, moves, enemy_color):
         """Kingside castling (O-O)."""
-        if self.board[row][col + 1] == EMPTY_SQUARE and self.board[row][col + 2] == EMPTY_SQUARE:
-            if not self.squareUnderAttack(row, col + 1) and not self.squareUnderAttack(row, col + 2):
-                moves.append(Move((row, col), (row, col + 2), self.board, is_castle_move=True))
+        board = self.board
+        start_sq = row * BOARD_SIZE + col
+        if board[start_sq + 1] == EMPTY_SQUARE and board[start_sq + 2] == EMPTY_SQUARE:
+            if not cd.isSquareAttacked(board, row, col + 1, enemy_color) and \
+               not cd.isSquareAttacked(board, row, col + 2, enemy_color):
+                moves.append(packMove(start_sq, start_sq + 2, board[start_sq], flags=CASTLE_FLAG))
 
-    def _getQueensideCastleMoves(self, row, col, moves):
+    def _getQueensideCastleMoves(self, row, col, moves, enemy_color):
         """Queenside castling (O-O-O)."""
-        if self.board[row][col - 1] == EMPTY_SQUARE and \
-           self.board[row][col - 2] == EMPTY_SQUARE and \
-           self.board[row][col - 3] == EMPTY_SQUARE:
-            if not self.squareUnderAttack(row, col - 1) and not self.squareUnderAttack(row, col - 2):
-                moves.append(Move((row, col), (row, col - 2), self.board, is_castle_move=True))
+        board = self.board
+        start_sq = row * BOARD_SIZE + col
+        if board[start_sq - 1] == EMPTY_SQUARE and \
+           board[start_sq - 2] == EMPTY_SQUARE and \
+           board[start_sq - 3] == EMPTY_SQUARE:
+            if not cd.isSquareAttacked(board, row, col - 1, enemy_color) and \
+               not cd.isSquareAttacked(board, row, col - 2, enemy_color):
+                moves.append(packMove(start_sq, start_sq - 2, board[start_sq], flags=CASTLE_FLAG))
@@ -7,21 +7,22 @@ import pygame as p
 import ChessEngine, ChessAI
 import sys
 from multiprocessing import Process, Queue
+from move import Move
 from constants import (
     BOARD_WIDTH, BOARD_HEIGHT, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT,
-    DIMENSION, SQUARE_SIZE, MAX_FPS
+    DIMENSION, SQUARE_SIZE, MAX_FPS, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, COLOR_MASK, PIECE_CODES
 )
 IMAGES = {}
 
 
 def loadImages():
     """
-    Initialize a global directory of images.
+    Initialize a global directory of images, keyed by piece code.
     This will be called exactly once in the main.
     """
     pieces = ['wp', 'wR', 'wN', 'wB', 'wK', 'wQ', 'bp', 'bR', 'bN', 'bB', 'bK', 'bQ']
     for piece in pieces:
-        IMAGES[piece] = p.transform.scale(p.image.load("images/" + piece + ".png"), (SQUARE_SIZE, SQUARE_SIZE))
+        IMAGES[PIECE_CODES[piece]] = p.transform.scale(p.image.load("images/" + piece + ".png"), (SQUARE_SIZE, SQUARE_SIZE))
 
 
 def main():
@@ -68,9 +69,9 @@ def main():
                         square_selected = (row, col)
                         player_clicks.append(square_selected)  # append for both 1st and 2nd click
                     if len(player_clicks) == 2 and human_turn:  # after 2nd click
-                        move = ChessEngine.Move(player_clicks[0], player_clicks[1], game_state.board)
+                        move = Move(player_clicks[0], player_clicks[1], game_state.board)
                         for i in range(len(valid_moves)):
-                            if move == valid_moves[i]:
+                            if move == Move.fromPacked(valid_moves[i]):
                                 game_state.makeMove(valid_moves[i])
                                 move_made = True
                                 animate = True
@@ -122,7 +123,7 @@ def main():
 
         if move_made:
             if animate:
-                animateMove(game_state.move_log[-1], screen, game_state.board, clock)
+                animateMove(Move.fromPacked(game_state.move_log[-1]), screen, game_state.board, clock)
             valid_moves = game_state.getValidMoves()
             move_made = False
             animate = False
@@ -175,15 +176,15 @@ def highlightSquares(screen, game_state, valid_moves, square_selected):
     Highlight square selected and moves for piece selected.
     """
     if (len(game_state.move_log)) > 0:
-        last_move = game_state.move_log[-1]
+        last_move = Move.fromPacked(game_state.move_log[-1])
         s = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
         s.set_alpha(100)
         s.fill(p.Color('green'))
         screen.blit(s, (last_move.end_col * SQUARE_SIZE, last_move.end_row * SQUARE_SIZE))
     if square_selected != ():
         row, col = square_selected
-        if game_state.board[row][col][0] == (
-                'w' if game_state.white_to_move else 'b'):  # square_selected is a piece that can be moved
+        if game_state.board[row * DIMENSION + col] & COLOR_MASK == (
+                WHITE_COLOR if game_state.white_to_move else BLACK_COLOR):  # square_selected is a piece that can be moved
             # highlight selected square
             s = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
             s.set_alpha(100)  # transparency value 0 -> transparent, 255 -> opaque
@@ -191,7 +192,7 @@ def highlightSquares(screen, game_state, valid_moves, square_selected):
             screen.blit(s, (col * SQUARE_SIZE, row * SQUARE_SIZE))
             # highlight moves from that square
             s.fill(p.Color('yellow'))
-            for move in valid_moves:
+            for move in map(Move.fromPacked, valid_moves):
                 if move.start_row == row and move.start_col == col:
                     screen.blit(s, (move.end_col * SQUARE_SIZE, move.end_row * SQUARE_SIZE))
 
@@ -202,8 +203,8 @@ def drawPieces(screen, board):
     """
     for row in range(DIMENSION):
         for column in range(DIMENSION):
-            piece = board[row][column]
-            if piece != "--":
+            piece = board[row * DIMENSION + column]
+            if piece != EMPTY_SQUARE:
                 screen.blit(IMAGES[piece], p.Rect(column * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
 
 
@@ -214,7 +215,7 @@ def drawMoveLog(screen, game_state, font):
     """
     move_log_rect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
     p.draw.rect(screen, p.Color('black'), move_log_rect)
-    move_log = game_state.move_log
+    move_log = [Move.fromPacked(move) for move in game_state.move_log]
     move_texts = []
     for i in range(0, len(move_log), 2):
         move_string = str(i // 2 + 1) + '. ' + str(move_log[i]) + " "
@@ -266,9 +267,9 @@ def animateMove(move, screen, board, clock):
         end_square = p.Rect(move.end_col * SQUARE_SIZE, move.end_row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
         p.draw.rect(screen, color, end_square)
         # draw captured piece onto rectangle
-        if move.piece_captured != '--':
+        if move.piece_captured != EMPTY_SQUARE:
             if move.is_enpassant_move:
-                enpassant_row = move.end_row + 1 if move.piece_captured[0] == 'b' else move.end_row - 1
+                enpassant_row = move.end_row + 1 if move.piece_captured & COLOR_MASK == BLACK_COLOR else move.end_row - 1
                 end_square = p.Rect(move.end_col * SQUARE_SIZE, enpassant_row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
             screen.blit(IMAGES[move.piece_captured], end_square)
         # draw moving piece
@@ -2,7 +2,58 @@
 Pin and check detection using ray-casting algorithm.
 """
 
-from constants import EMPTY_SQUARE
+from constants import (
+    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, COLOR_MASK, TYPE_MASK,
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+)
+
+# Ray directions: 0-3 orthogonal (up, left, down, right), 4-7 diagonal
+DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1),  # orthogonal
+              (-1, -1), (-1, 1), (1, -1), (1, 1))  # diagonal
+# Pin masks: bit j set means a piece may move along DIRECTIONS[j]. A pinned
+# piece may move both ways along its pin line, an unpinned one anywhere.
+PIN_LINE_MASKS = tuple(1 << j | 1 << DIRECTIONS.index((-d_row, -d_col))
+                       for j, (d_row, d_col) in enumerate(DIRECTIONS))
+UNPINNED_MASK = (1 << len(DIRECTIONS)) - 1
+KNIGHT_OFFSETS = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+KING_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def _onBoardTargets(row, col, offsets):
+    """Squares reached from (row, col) by each offset, skipping those off the board."""
+    return tuple((row + d_row) * BOARD_SIZE + col + d_col for d_row, d_col in offsets
+                 if 0 <= row + d_row < BOARD_SIZE and 0 <= col + d_col < BOARD_SIZE)
+
+
+# Precomputed per-square targets, indexed by square (row * BOARD_SIZE + col),
+# so the hot loops never need a bounds check
+KNIGHT_TARGETS = tuple(_onBoardTargets(square // BOARD_SIZE, square % BOARD_SIZE, KNIGHT_OFFSETS)
+                       for square in range(BOARD_SIZE * BOARD_SIZE))
+KING_TARGETS = tuple(_onBoardTargets(square // BOARD_SIZE, square % BOARD_SIZE, KING_OFFSETS)
+                     for square in range(BOARD_SIZE * BOARD_SIZE))
+# RAY_TARGETS[square][j]: squares along DIRECTIONS[j] from square, nearest first
+RAY_TARGETS = tuple(
+    tuple(_onBoardTargets(square // BOARD_SIZE, square % BOARD_SIZE,
+                          [(d_row * i, d_col * i) for i in range(1, BOARD_SIZE)])
+          for d_row, d_col in DIRECTIONS)
+    for square in range(BOARD_SIZE * BOARD_SIZE)
+)
+# The same rays split by slider kind, so attack tests don't slice per call
+ORTHOGONAL_RAY_TARGETS = tuple(rays[:4] for rays in RAY_TARGETS)
+DIAGONAL_RAY_TARGETS = tuple(rays[4:] for rays in RAY_TARGETS)
+
+
+def _rayIndices(square):
+    """For each square, the index of the ray from square through it, or -1 if none."""
+    indices = [-1] * (BOARD_SIZE * BOARD_SIZE)
+    for j, ray in enumerate(RAY_TARGETS[square]):
+        for end_square in ray:
+            indices[end_square] = j
+    return tuple(indices)
+
+
+# RAY_INDEX[square][other]: which of DIRECTIONS leads from square to other, -1 if not aligned
+RAY_INDEX = tuple(_rayIndices(square) for square in range(BOARD_SIZE * BOARD_SIZE))
 
 
 def checkForPinsAndChecks(game_state):
@@ -13,83 +64,81 @@ def checkForPinsAndChecks(game_state):
     to identify attacking pieces and pinned friendly pieces.
     
     Returns:
-        tuple: (in_check, pins, checks)
+        tuple: (in_check, pins_by_square, checks)
             - in_check: Boolean indicating if king is in check
-            - pins: List of pinned pieces in format (row, col, direction_row, direction_col)
-            - checks: List of checking pieces in same format as pins
+            - pins_by_square: Dict mapping each pinned piece's square
+              (row * BOARD_SIZE + col) to the PIN_LINE_MASKS entry of its pin line
+            - checks: List of checking pieces in format (row, col, direction_row, direction_col)
     """
-    pins = []
+    pins_by_square = {}
     checks = []
     in_check = False
+    board = game_state.board
     
     if game_state.white_to_move:
-        enemy_color = "b"
-        ally_color = "w"
+        enemy_color = BLACK_COLOR
+        ally_color = WHITE_COLOR
         start_row = game_state.white_king_location[0]
         start_col = game_state.white_king_location[1]
     else:
-        enemy_color = "w"
-        ally_color = "b"
+        enemy_color = WHITE_COLOR
+        ally_color = BLACK_COLOR
         start_row = game_state.black_king_location[0]
         start_col = game_state.black_king_location[1]
     
-    # Check in all 8 directions from king
-    directions = ((-1, 0), (0, -1), (1, 0), (0, 1),  # orthogonal
-                  (-1, -1), (-1, 1), (1, -1), (1, 1))  # diagonal
+    king_square = start_row * BOARD_SIZE + start_col
+    rays = RAY_TARGETS[king_square]
     
-    for j in range(len(directions)):
-        direction = directions[j]
-        possible_pin = ()
+    # Check in all 8 directions from king
+    for j in range(len(DIRECTIONS)):
+        direction = DIRECTIONS[j]
+        possible_pin = None
         
         # Check each square along the ray
-        for i in range(1, 8):
-            end_row = start_row + direction[0] * i
-            end_col = start_col + direction[1] * i
-            
-            if not (0 <= end_row <= 7 and 0 <= end_col <= 7):
-                break  # Off board
-            
-            end_piece = game_state.board[end_row][end_col]
+        for i, end_square in enumerate(rays[j], 1):
+            end_piece = board[end_square]
             
             # Found an allied piece
-            if end_piece[0] == ally_color and end_piece[1] != "K":
-                if possible_pin == ():
-                    possible_pin = (end_row, end_col, direction[0], direction[1])
+            if end_piece & COLOR_MASK == ally_color and end_piece & TYPE_MASK != KING:
+                if possible_pin is None:
+                    possible_pin = end_square
                 else:
                     break  # Second allied piece blocks ray
             
             # Found an enemy piece
-            elif end_piece[0] == enemy_color:
-                enemy_type = end_piece[1]
+            elif end_piece & COLOR_MASK == enemy_color:
+                enemy_type = end_piece & TYPE_MASK
                 
                 # Check if this enemy piece can attack along this ray
-                if _isValidAttackDirection(j, enemy_type, i):
-                    if possible_pin == ():
+                if _isValidAttackDirection(j, enemy_type, i, enemy_color):
+                    if possible_pin is None:
                         # No blocking piece - it's a check
                         in_check = True
-                        checks.append((end_row, end_col, direction[0], direction[1]))
+                        checks.append((end_square >> 3, end_square & 7, direction[0], direction[1]))
                         break
                     else:
                         # Blocking piece - it's pinned
-                        pins.append(possible_pin)
+                        pins_by_square[possible_pin] = PIN_LINE_MASKS[j]
                         break
                 else:
                     break  # Enemy piece can't attack this way
     
     # Check for knight checks (special case - knights jump)
-    _checkForKnightChecks(game_state, start_row, start_col, enemy_color, checks, in_check)
+    if _checkForKnightChecks(board, king_square, enemy_color, checks):
+        in_check = True
     
-    return in_check, pins, checks
+    return in_check, pins_by_square, checks
 
 
-def _isValidAttackDirection(direction_index, piece_type, distance):
+def _isValidAttackDirection(direction_index, piece_type, distance, enemy_color):
     """
     Determine if a piece can attack along the given direction.
     
     Args:
         direction_index: Index 0-7 representing the ray direction
-        piece_type: Type of enemy piece ('R', 'B', 'Q', 'K', 'p')
+        piece_type: Type of enemy piece (ROOK, BISHOP, QUEEN, KING, PAWN)
         distance: Distance from king to piece (1-7)
+        enemy_color: Color of the enemy piece
     
     Returns:
         Boolean indicating if the piece can attack along this direction
@@ -101,43 +150,132 @@ def _isValidAttackDirection(direction_index, piece_type, distance):
     is_diagonal = 4 <= direction_index <= 7
     
     # Rooks attack orthogonally
-    if is_orthogonal and piece_type == "R":
+    if is_orthogonal and piece_type == ROOK:
         return True
     
     # Bishops attack diagonally
-    if is_diagonal and piece_type == "B":
+    if is_diagonal and piece_type == BISHOP:
         return True
     
     # Queens attack in all directions
-    if piece_type == "Q":
+    if piece_type == QUEEN:
         return True
     
     # Pawns only attack diagonally, one square away, in specific directions
-    if distance == 1 and piece_type == "p":
-        # White pawns attack upward-diagonals (indices 4, 5)
-        # Black pawns attack downward-diagonals (indices 6, 7)
-        return direction_index in (4, 5, 6, 7)
+    if distance == 1 and piece_type == PAWN:
+        # White pawns attack upward, so they sit below the king (indices 6, 7)
+        # Black pawns attack downward, so they sit above the king (indices 4, 5)
+        if enemy_color == WHITE_COLOR:
+            return direction_index in (6, 7)
+        return direction_index in (4, 5)
     
     # Kings attack one square in any direction
-    if distance == 1 and piece_type == "K":
+    if distance == 1 and piece_type == KING:
         return True
     
     return False
 
 
-def _checkForKnightChecks(game_state, start_row, start_col, enemy_color, checks, in_check):
+def _checkForKnightChecks(board, king_square, enemy_color, checks):
     """
     Check if any enemy knights are attacking the king.
     Knights have unique movement pattern (L-shaped), so they're checked separately.
+    
+    Returns:
+        Boolean indicating if a knight gives check
     """
-    knight_moves = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
+    in_check = False
+    enemy_knight = enemy_color | KNIGHT
     
-    for move in knight_moves:
-        end_row = start_row + move[0]
-        end_col = start_col + move[1]
-        
-        if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-            end_piece = game_state.board[end_row][end_col]
-            if end_piece[0] == enemy_color and end_piece[1] == "N":
-                in_check = True
-                checks.append((end_row, end_col, move[0], move[1]))
+    for end_square in KNIGHT_TARGETS[king_square]:
+        if board[end_square] == enemy_knight:
+            in_check = True
+            end_row, end_col = end_square >> 3, end_square & 7
+            checks.append((end_row, end_col, end_row - (king_square >> 3), end_col - (king_square & 7)))
+    
+    return in_check
+
+
+def isAttackedAlongRay(board, square, direction_index, by_color):
+    """
+    Determine if a slider of the given color attacks square along one ray.
+    
+    Args:
+        board: Flat board (square index = row * BOARD_SIZE + col)
+        square: Square the ray starts from
+        direction_index: Index into DIRECTIONS / RAY_TARGETS
+        by_color: Color of the attacking side (WHITE_COLOR or BLACK_COLOR)
+    
+    Returns:
+        Boolean indicating if the first piece along the ray attacks square
+    """
+    enemy_queen = by_color | QUEEN
+    enemy_slider = by_color | (ROOK if direction_index < 4 else BISHOP)
+    for end_square in RAY_TARGETS[square][direction_index]:
+        end_piece = board[end_square]
+        if end_piece != EMPTY_SQUARE:
+            return end_piece == enemy_slider or end_piece == enemy_queen
+    return False
+
+
+def isSquareAttacked(board, row, col, by_color):
+    """
+    Determine if a square is attacked by any piece of the given color.
+    
+    Looks outward from the square for attackers instead of generating the
+    opponent's moves, and stops at the first attacker found.
+    
+    Args:
+        board: Flat board (square index = row * BOARD_SIZE + col)
+        row: Row of the square
+        col: Column of the square
+        by_color: Color of the attacking side (WHITE_COLOR or BLACK_COLOR)
+    
+    Returns:
+        Boolean indicating if the square is attacked
+    """
+    square = row * BOARD_SIZE + col
+    
+    # Knights
+    enemy_knight = by_color | KNIGHT
+    for end_square in KNIGHT_TARGETS[square]:
+        if board[end_square] == enemy_knight:
+            return True
+    
+    # Pawns attack diagonally forward, so look one row behind the square
+    pawn_row = row + 1 if by_color == WHITE_COLOR else row - 1
+    if 0 <= pawn_row <= 7:
+        if col - 1 >= 0 and board[pawn_row * BOARD_SIZE + col - 1] == by_color | PAWN:
+            return True
+        if col + 1 <= 7 and board[pawn_row * BOARD_SIZE + col + 1] == by_color | PAWN:
+            return True
+    
+    # Kings
+    enemy_king = by_color | KING
+    for end_square in KING_TARGETS[square]:
+        if board[end_square] == enemy_king:
+            return True
+    
+    # Sliding pieces: rooks/queens orthogonally, bishops/queens diagonally.
+    # One tight loop per piece kind, so nothing is recomputed per ray.
+    enemy_queen = by_color | QUEEN
+    
+    enemy_rook = by_color | ROOK
+    for ray in ORTHOGONAL_RAY_TARGETS[square]:
+        for end_square in ray:
+            end_piece = board[end_square]
+            if end_piece != EMPTY_SQUARE:
+                if end_piece == enemy_rook or end_piece == enemy_queen:
+                    return True
+                break  # First piece along the ray blocks it
+    
+    enemy_bishop = by_color | BISHOP
+    for ray in DIAGONAL_RAY_TARGETS[square]:
+        for end_square in ray:
+            end_piece = board[end_square]
+            if end_piece != EMPTY_SQUARE:
+                if end_piece == enemy_bishop or end_piece == enemy_queen:
+                    return True
+                break  # First piece along the ray blocks it
+    
+    return False
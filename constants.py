@@ -13,26 +13,57 @@ MOVE_LOG_PANEL_WIDTH = 250
 MOVE_LOG_PANEL_HEIGHT = BOARD_HEIGHT
 MAX_FPS = 15
 
-# Piece notation
-EMPTY_SQUARE = "--"
-WHITE_COLOR = "w"
-BLACK_COLOR = "b"
+# Piece encoding: each square holds a small int, color bits | type bits
+EMPTY_SQUARE = 0
+WHITE_COLOR = 8
+BLACK_COLOR = 16
+COLOR_MASK = 24
+TYPE_MASK = 7
 
 # Piece types
-PAWN = "p"
-ROOK = "R"
-KNIGHT = "N"
-BISHOP = "B"
-QUEEN = "Q"
-KING = "K"
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+
+# Castling rights, packed into a single int as a bit mask
+WKS = 1  # White kingside
+WQS = 2  # White queenside
+BKS = 4  # Black kingside
+BQS = 8  # Black queenside
+ALL_CASTLING_RIGHTS = WKS | WQS | BKS | BQS
+
+# Piece names used for images and notation
+PIECE_CODES = {
+    "--": EMPTY_SQUARE,
+    "wp": WHITE_COLOR | PAWN, "wN": WHITE_COLOR | KNIGHT, "wB": WHITE_COLOR | BISHOP,
+    "wR": WHITE_COLOR | ROOK, "wQ": WHITE_COLOR | QUEEN, "wK": WHITE_COLOR | KING,
+    "bp": BLACK_COLOR | PAWN, "bN": BLACK_COLOR | KNIGHT, "bB": BLACK_COLOR | BISHOP,
+    "bR": BLACK_COLOR | ROOK, "bQ": BLACK_COLOR | QUEEN, "bK": BLACK_COLOR | KING,
+}
+PIECE_NAMES = {code: name for name, code in PIECE_CODES.items()}
+PIECE_TYPE_NAMES = {PAWN: "p", KNIGHT: "N", BISHOP: "B", ROOK: "R", QUEEN: "Q", KING: "K"}
 
 # AI constants
 CHECKMATE_SCORE = 1000
 STALEMATE_SCORE = 0
 AI_DEPTH = 3
+MAX_PLY = 64  # Upper bound on search ply, sizes the killer move table
+NULL_MOVE_REDUCTION = 2  # Extra depth reduction (R) for the null-move search
+NULL_MOVE_MIN_DEPTH = 3  # Null-move pruning is only tried with at least this much depth left
+NULL_WINDOW = 0.001  # Width of a zero-window search, scores are fractional pawns
+
+# Transposition table
+TT_MAX_ENTRIES = 1 << 20  # Table is cleared when it grows past this size
+ZOBRIST_SEED = 2024  # Fixed seed so position keys are reproducible
+
+# Pseudo-legal move list cache
+MOVE_CACHE_MAX_ENTRIES = 1 << 15  # Cache is cleared when it grows past this size (entries run 1-2 KB)
 
-# Initial board setup
-INITIAL_BOARD = [
+# Initial board setup, stored flat: square index = row * BOARD_SIZE + col
+INITIAL_LAYOUT = [
     ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
     ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
     ["--", "--", "--", "--", "--", "--", "--", "--"],
@@ -42,13 +73,14 @@ INITIAL_BOARD = [
     ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
     ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
 ]
+INITIAL_BOARD = bytearray(PIECE_CODES[name] for row in INITIAL_LAYOUT for name in row)
 
 # Initial king locations
 WHITE_KING_START = (7, 4)
 BLACK_KING_START = (0, 4)
 
 # Piece values for evaluation
-PIECE_VALUES = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "p": 1}
+PIECE_VALUES = {KING: 0, QUEEN: 9, ROOK: 5, BISHOP: 3, KNIGHT: 3, PAWN: 1}
 
 # Piece position tables (for positional evaluation)
 KNIGHT_SCORES = [
@@ -107,14 +139,14 @@ PAWN_SCORES = [
 ]
 
 PIECE_POSITION_SCORES = {
-    "wN": KNIGHT_SCORES,
-    "bN": KNIGHT_SCORES[::-1],
-    "wB": BISHOP_SCORES,
-    "bB": BISHOP_SCORES[::-1],
-    "wQ": QUEEN_SCORES,
-    "bQ": QUEEN_SCORES[::-1],
-    "wR": ROOK_SCORES,
-    "bR": ROOK_SCORES[::-1],
-    "wp": PAWN_SCORES,
-    "bp": PAWN_SCORES[::-1]
+    PIECE_CODES["wN"]: KNIGHT_SCORES,
+    PIECE_CODES["bN"]: KNIGHT_SCORES[::-1],
+    PIECE_CODES["wB"]: BISHOP_SCORES,
+    PIECE_CODES["bB"]: BISHOP_SCORES[::-1],
+    PIECE_CODES["wQ"]: QUEEN_SCORES,
+    PIECE_CODES["bQ"]: QUEEN_SCORES[::-1],
+    PIECE_CODES["wR"]: ROOK_SCORES,
+    PIECE_CODES["bR"]: ROOK_SCORES[::-1],
+    PIECE_CODES["wp"]: PAWN_SCORES,
+    PIECE_CODES["bp"]: PAWN_SCORES[::-1]
 }
@@ -3,10 +3,36 @@ Board evaluation functions for AI decision-making.
 Evaluates positions using material count and piece positioning.
 """
 
+from itertools import repeat
+from operator import add, mul
 from constants import (
-    PIECE_VALUES, PIECE_POSITION_SCORES, CHECKMATE_SCORE, STALEMATE_SCORE, EMPTY_SQUARE
+    PIECE_VALUES, PIECE_POSITION_SCORES, EMPTY_SQUARE,
+    BOARD_SIZE, WHITE_COLOR, COLOR_MASK, TYPE_MASK, KING, PIECE_NAMES
 )
 
+SQUARES = range(BOARD_SIZE * BOARD_SIZE)
+
+
+def _buildSquareScores():
+    """
+    Precompute the signed value of every piece code on every square.
+    
+    Combines material and positional score, negated for black pieces, so a
+    position's score is just the sum of its squares' entries. The table is
+    flat, so a lookup is a single index: piece * 64 + square, i.e.
+    piece << 6 | square.
+    
+    Returns:
+        List of scores indexed by piece code * 64 + square
+    """
+    square_scores = [0.0] * ((max(PIECE_NAMES) + 1) * len(SQUARES))
+    for piece in PIECE_NAMES:
+        sign = 1 if piece & COLOR_MASK == WHITE_COLOR else -1
+        for square in SQUARES:
+            square_scores[piece * len(SQUARES) + square] = \
+                evaluatePiece(piece, square // BOARD_SIZE, square % BOARD_SIZE) * sign
+    return square_scores
+
 
 def scoreBoard(game_state):
     """
@@ -21,40 +47,28 @@ def scoreBoard(game_state):
     Returns:
         Float: Score representing position evaluation
     """
-    if game_state.checkmate:
-        if game_state.white_to_move:
-            return -CHECKMATE_SCORE  # Black wins
-        else:
-            return CHECKMATE_SCORE   # White wins
+    # Set by GameState.getValidMoves once the game is over
+    terminal_score = game_state.terminal_score
+    if terminal_score is not None:
+        return terminal_score
     
-    elif game_state.stalemate:
-        return STALEMATE_SCORE
-    
-    score = 0
+    # Kept up to date by GameState.makeMove/undoMove
+    return game_state.score
+
+
+def computeScore(board):
+    """
+    Compute the material and positional score of a board from scratch.
     
-    # Evaluate each square on the board
-    for row in range(len(game_state.board)):
-        for col in range(len(game_state.board[row])):
-            piece = game_state.board[row][col]
-            
-            if piece != EMPTY_SQUARE:
-                # Get material value (how much the piece is worth)
-                piece_value = PIECE_VALUES[piece[1]]
-                
-                # Get positional bonus (where the piece is positioned)
-                piece_position_score = 0
-                if piece[1] != "K":  # King position score handled differently
-                    piece_position_score = PIECE_POSITION_SCORES[piece][row][col]
-                
-                total_piece_value = piece_value + piece_position_score
-                
-                # Add or subtract based on piece color
-                if piece[0] == "w":
-                    score += total_piece_value
-                else:
-                    score -= total_piece_value
+    Used to initialise GameState.score; during play the score is updated
+    incrementally as moves are made.
     
-    return score
+    Returns:
+        Float: Score from white's point of view
+    """
+    # Index = piece * 64 + square for every square, looked up and summed at C level
+    indices = map(add, map(mul, board, repeat(len(SQUARES))), SQUARES)
+    return sum(map(SQUARE_SCORES.__getitem__, indices))
 
 
 def evaluatePiece(piece, row, col):
@@ -62,7 +76,7 @@ def evaluatePiece(piece, row, col):
     Evaluate a single piece based on its material and position.
     
     Args:
-        piece: Piece string (e.g., 'wQ', 'bp')
+        piece: Piece code (e.g., WHITE_COLOR | QUEEN)
         row: Row position on board
         col: Column position on board
     
@@ -72,10 +86,13 @@ def evaluatePiece(piece, row, col):
     if piece == EMPTY_SQUARE:
         return 0
     
-    material_value = PIECE_VALUES.get(piece[1], 0)
+    material_value = PIECE_VALUES.get(piece & TYPE_MASK, 0)
     position_value = 0
     
-    if piece[1] != "K":
+    if piece & TYPE_MASK != KING:
         position_value = PIECE_POSITION_SCORES[piece][row][col]
     
     return material_value + position_value
+
+
+SQUARE_SCORES = _buildSquareScores()
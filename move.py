@@ -1,7 +1,61 @@
 """
-Move and CastleRights classes for chess game state management.
+Move representation for chess game state management.
+
+The engine works on moves packed into a single int; the Move class wraps a
+packed move with row/column fields and notation for the UI.
 """
 
+from constants import (
+    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, TYPE_MASK,
+    PAWN, PIECE_TYPE_NAMES
+)
+
+# Packed move layout:
+#   bits  0-5   start square (row * BOARD_SIZE + col)
+#   bits  6-11  end square
+#   bits 12-16  piece moved
+#   bits 17-21  piece captured (EMPTY_SQUARE if none)
+#   bits 22-24  special move flags
+SQUARE_MASK = 63
+PIECE_MASK = 31
+END_SHIFT = 6
+MOVED_SHIFT = 12
+CAPTURED_SHIFT = 17
+CAPTURE_MASK = PIECE_MASK << CAPTURED_SHIFT
+
+ENPASSANT_FLAG = 1 << 22
+CASTLE_FLAG = 1 << 23
+PROMOTION_FLAG = 1 << 24
+
+
+def packMove(start_sq, end_sq, piece_moved, piece_captured=EMPTY_SQUARE, flags=0):
+    """
+    Pack a move into a single int.
+    
+    Args:
+        start_sq: Starting square index (row * BOARD_SIZE + col)
+        end_sq: Ending square index
+        piece_moved: Code of the moving piece
+        piece_captured: Code of the captured piece, EMPTY_SQUARE if none
+        flags: ENPASSANT_FLAG, CASTLE_FLAG and/or PROMOTION_FLAG
+    
+    Returns:
+        int: Packed move
+    """
+    return start_sq | end_sq << END_SHIFT | piece_moved << MOVED_SHIFT | piece_captured << CAPTURED_SHIFT | flags
+
+
+def unpackMove(move):
+    """
+    Split a packed move into its fields.
+    
+    Returns:
+        tuple: (start_sq, end_sq, piece_moved, piece_captured, flags)
+    """
+    return (move & SQUARE_MASK, move >> END_SHIFT & SQUARE_MASK,
+            move >> MOVED_SHIFT & PIECE_MASK, move >> CAPTURED_SHIFT & PIECE_MASK,
+            move & (ENPASSANT_FLAG | CASTLE_FLAG | PROMOTION_FLAG))
+
 
 class Move:
     """
@@ -27,33 +81,55 @@ class Move:
             is_enpassant_move: Boolean indicating en passant capture
             is_castle_move: Boolean indicating castling move
         """
-        self.start_row = start_square[0]
-        self.start_col = start_square[1]
-        self.end_row = end_square[0]
-        self.end_col = end_square[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
+        start_sq = start_square[0] * BOARD_SIZE + start_square[1]
+        end_sq = end_square[0] * BOARD_SIZE + end_square[1]
+        piece_moved = board[start_sq]
+        piece_captured = board[end_sq]
+        flags = 0
         
         # Pawn promotion: pawn reaches last rank
-        self.is_pawn_promotion = (self.piece_moved == "wp" and self.end_row == 0) or \
-                                 (self.piece_moved == "bp" and self.end_row == 7)
+        if (piece_moved == WHITE_COLOR | PAWN and end_square[0] == 0) or \
+           (piece_moved == BLACK_COLOR | PAWN and end_square[0] == 7):
+            flags |= PROMOTION_FLAG
         
         # En passant move
-        self.is_enpassant_move = is_enpassant_move
-        if self.is_enpassant_move:
-            self.piece_captured = "wp" if self.piece_moved == "bp" else "bp"
+        if is_enpassant_move:
+            flags |= ENPASSANT_FLAG
+            piece_captured = WHITE_COLOR | PAWN if piece_moved == BLACK_COLOR | PAWN else BLACK_COLOR | PAWN
         
         # Castle move
-        self.is_castle_move = is_castle_move
+        if is_castle_move:
+            flags |= CASTLE_FLAG
         
-        self.is_capture = self.piece_captured != "--"
-        self.moveID = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+        self._setFields(packMove(start_sq, end_sq, piece_moved, piece_captured, flags))
+
+    @classmethod
+    def fromPacked(cls, move):
+        """Build a Move from a packed move, e.g. one chosen by the engine."""
+        instance = cls.__new__(cls)
+        instance._setFields(move)
+        return instance
+
+    def _setFields(self, move):
+        """Fill in the row/column and flag attributes from a packed move."""
+        start_sq, end_sq, self.piece_moved, self.piece_captured, flags = unpackMove(move)
+        self.packed = move
+        self.start_row, self.start_col = divmod(start_sq, BOARD_SIZE)
+        self.end_row, self.end_col = divmod(end_sq, BOARD_SIZE)
+        self.is_pawn_promotion = bool(flags & PROMOTION_FLAG)
+        self.is_enpassant_move = bool(flags & ENPASSANT_FLAG)
+        self.is_castle_move = bool(flags & CASTLE_FLAG)
+        self.is_capture = self.piece_captured != EMPTY_SQUARE
+        # Start and end squares, bit-packed: 12 bits identify the move
+        self.moveID = move & (SQUARE_MASK | SQUARE_MASK << END_SHIFT)
 
     def __eq__(self, other):
         """Check if two moves are identical based on their moveID."""
-        if isinstance(other, Move):
-            return self.moveID == other.moveID
-        return False
+        return self.moveID == other.moveID
+
+    def __hash__(self):
+        """Hash on moveID, so equal moves can share set/dict entries."""
+        return self.moveID
 
     def getRankFile(self, row, col):
         """Convert array indices (row, col) to chess notation (e.g., 'e4')."""
@@ -77,17 +153,18 @@ class Move:
             return self.getRankFile(self.start_row, self.start_col)[0] + "x" + \
                    self.getRankFile(self.end_row, self.end_col) + " e.p."
         
-        if self.piece_captured != "--":
-            if self.piece_moved[1] == "p":
+        piece_type = self.piece_moved & TYPE_MASK
+        if self.piece_captured != EMPTY_SQUARE:
+            if piece_type == PAWN:
                 return self.getRankFile(self.start_row, self.start_col)[0] + "x" + \
                        self.getRankFile(self.end_row, self.end_col)
             else:
-                return self.piece_moved[1] + "x" + self.getRankFile(self.end_row, self.end_col)
+                return PIECE_TYPE_NAMES[piece_type] + "x" + self.getRankFile(self.end_row, self.end_col)
         else:
-            if self.piece_moved[1] == "p":
+            if piece_type == PAWN:
                 return self.getRankFile(self.end_row, self.end_col)
             else:
-                return self.piece_moved[1] + self.getRankFile(self.end_row, self.end_col)
+                return PIECE_TYPE_NAMES[piece_type] + self.getRankFile(self.end_row, self.end_col)
 
     def __str__(self):
         """Return a string representation of the move."""
@@ -96,35 +173,14 @@ class Move:
 
         end_square = self.getRankFile(self.end_row, self.end_col)
 
-        if self.piece_moved[1] == "p":
+        piece_type = self.piece_moved & TYPE_MASK
+        if piece_type == PAWN:
             if self.is_capture:
                 return self.cols_to_files[self.start_col] + "x" + end_square
             else:
                 return end_square + "Q" if self.is_pawn_promotion else end_square
 
-        move_string = self.piece_moved[1]
+        move_string = PIECE_TYPE_NAMES[piece_type]
         if self.is_capture:
             move_string += "x"
         return move_string + end_square
-
-
-class CastleRights:
-    """
-    Tracks castling availability for both players.
-    Castling rights are lost when king or rook moves, or rook is captured.
-    """
-    
-    def __init__(self, wks, bks, wqs, bqs):
-        """
-        Initialize castling rights.
-        
-        Args:
-            wks: White kingside castling allowed
-            bks: Black kingside castling allowed
-            wqs: White queenside castling allowed
-            bqs: Black queenside castling allowed
-        """
-        self.wks = wks  # White kingside
-        self.bks = bks  # Black kingside
-        self.wqs = wqs  # White queenside
-        self.bqs = bqs  # Black queenside
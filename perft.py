@@ -0,0 +1,128 @@
+"""
+Perft: count the leaf nodes of the move tree to a fixed depth.
+
+Compares move generation against published node counts, through both the
+legal generator (getValidMoves) and the search's path (getPseudoLegalMoves
+followed by kingLeftInCheck). Run with: python perft.py
+"""
+
+import sys
+import time
+import ChessEngine
+import zobrist
+from constants import (
+    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, KING, PIECE_CODES,
+    WKS, WQS, BKS, BQS
+)
+from evaluation import computeScore
+
+# Piece letters in FEN (upper case white) -> piece code
+FEN_PIECES = {name[1].upper() if name[0] == "w" else name[1].lower(): code
+              for name, code in PIECE_CODES.items() if code != EMPTY_SQUARE}
+FEN_CASTLING_RIGHTS = {"K": WKS, "Q": WQS, "k": BKS, "q": BQS}
+
+# (name, FEN, expected node counts for depth 1, 2, ...). Depths are limited
+# to those without promotions, since the engine only promotes to a queen.
+PERFT_POSITIONS = (
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -",
+     (20, 400, 8902, 197281)),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -",
+     (48, 2039, 97862)),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - -",
+     (14, 191, 2812, 43238, 674624)),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - -",
+     (46, 2079, 89890)),
+)
+
+
+def loadFen(fen):
+    """
+    Build a GameState from the first four fields of a FEN string.
+
+    Args:
+        fen: Piece placement, side to move, castling rights and en passant square
+
+    Returns:
+        GameState: Position with its key and score computed from scratch
+    """
+    placement, side, castling, enpassant = fen.split()[:4]
+    game_state = ChessEngine.GameState()
+
+    board = game_state.board
+    board[:] = bytes(BOARD_SIZE * BOARD_SIZE)
+    for row, rank in enumerate(placement.split("/")):
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+            else:
+                board[row * BOARD_SIZE + col] = FEN_PIECES[char]
+                col += 1
+    for square, piece in enumerate(board):
+        if piece == WHITE_COLOR | KING:
+            game_state.white_king_location = (square // BOARD_SIZE, square % BOARD_SIZE)
+        elif piece == BLACK_COLOR | KING:
+            game_state.black_king_location = (square // BOARD_SIZE, square % BOARD_SIZE)
+
+    game_state.white_to_move = side == "w"
+    if not game_state.white_to_move:
+        game_state.ally_color, game_state.enemy_color = BLACK_COLOR, WHITE_COLOR
+
+    game_state.current_castling_rights = 0
+    for char in castling.replace("-", ""):
+        game_state.current_castling_rights |= FEN_CASTLING_RIGHTS[char]
+    game_state.castle_rights_log = [game_state.current_castling_rights]
+
+    if enpassant != "-":
+        game_state.enpassant_possible = (BOARD_SIZE - int(enpassant[1]), ord(enpassant[0]) - ord("a"))
+    game_state.enpassant_possible_log = [game_state.enpassant_possible]
+
+    game_state.zkey = zobrist.computeHash(game_state)
+    game_state.score = computeScore(board)
+    return game_state
+
+
+def perft(game_state, depth):
+    """Count leaf nodes at depth using the legal move generator."""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in game_state.getValidMoves():
+        game_state.makeMove(move)
+        nodes += perft(game_state, depth - 1)
+        game_state.undoMove()
+    return nodes
+
+
+def perftPseudoLegal(game_state, depth):
+    """Count leaf nodes at depth the way the search does: make, then reject if the king is left in check."""
+    if depth == 0:
+        return 1
+    nodes = 0
+    moves = game_state.getPseudoLegalMoves()
+    in_check = game_state.in_check
+    for move in moves:
+        game_state.makeMove(move)
+        if not game_state.kingLeftInCheck(in_check):
+            nodes += perftPseudoLegal(game_state, depth - 1)
+        game_state.undoMove()
+    return nodes
+
+
+def main():
+    """Run every position to each listed depth; exit with status 1 on a mismatch."""
+    failures = 0
+    for name, fen, expected_counts in PERFT_POSITIONS:
+        for depth, expected in enumerate(expected_counts, 1):
+            for count_nodes in (perft, perftPseudoLegal):
+                start_time = time.time()
+                nodes = count_nodes(loadFen(fen), depth)
+                status = "ok" if nodes == expected else "FAIL (expected %d)" % expected
+                failures += nodes != expected
+                print("%-10s depth %d %-16s %8d  %5.2fs  %s"
+                      % (name, depth, count_nodes.__name__, nodes, time.time() - start_time, status))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
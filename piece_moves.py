@@ -1,219 +1,266 @@
 """
 Piece movement logic for all chess pieces.
 Each piece has specific movement rules that respect board boundaries and piece pinning.
+Moves are appended as packed ints (see move.packMove).
 """
 
-from move import Move
-from constants import EMPTY_SQUARE
+from move import END_SHIFT, MOVED_SHIFT, CAPTURED_SHIFT, ENPASSANT_FLAG, PROMOTION_FLAG
+from check_detection import KNIGHT_TARGETS, KING_TARGETS, RAY_TARGETS, UNPINNED_MASK, isSquareAttacked
+from constants import (
+    BOARD_SIZE, EMPTY_SQUARE, WHITE_COLOR, BLACK_COLOR, COLOR_MASK,
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+)
 
+# Indices into check_detection.DIRECTIONS / RAY_TARGETS for each slider
+ROOK_RAYS = (0, 1, 2, 3)  # up, left, down, right
+BISHOP_RAYS = (4, 5, 6, 7)  # diagonals
+QUEEN_RAYS = ROOK_RAYS + BISHOP_RAYS
 
-def getPawnMoves(game_state, row, col, moves):
+# Pin mask bits of the pawn moves: (push, capture left, capture right)
+WHITE_PAWN_DIRECTION_BITS = (1 << 0, 1 << 4, 1 << 5)  # up, up-left, up-right
+BLACK_PAWN_DIRECTION_BITS = (1 << 2, 1 << 6, 1 << 7)  # down, down-left, down-right
+
+
+def _pawnTargets(move_amount, start_row, direction_bits):
     """
-    Get all valid pawn moves for the pawn at (row, col).
-    Handles: normal advances (1 or 2 squares), captures, en passant, and promotion.
+    Per-square pawn destinations for one side, clipped to the board.
+    
+    Args:
+        move_amount: Row step of the side's pawns (-1 for white, 1 for black)
+        start_row: Row the side's pawns start on (and may advance two from)
+        direction_bits: The side's (push, capture left, capture right) pin mask bits
+    
+    Returns:
+        tuple: (pushes, captures), each indexed by square
+            - pushes: Single advance square, then the double advance square
+              for pawns on start_row
+            - captures: (end_sq, pin_bit) for each diagonal capture square
     """
-    piece_pinned = False
-    pin_direction = ()
+    pushes = []
+    captures = []
+    for square in range(BOARD_SIZE * BOARD_SIZE):
+        row, col = square // BOARD_SIZE, square % BOARD_SIZE
+        if not 0 <= row + move_amount < BOARD_SIZE:
+            pushes.append(())
+            captures.append(())
+            continue
+        forward_sq = square + move_amount * BOARD_SIZE
+        if row == start_row:
+            pushes.append((forward_sq, forward_sq + move_amount * BOARD_SIZE))
+        else:
+            pushes.append((forward_sq,))
+        captures.append(tuple((forward_sq + col_offset, pin_bit)
+                              for col_offset, pin_bit in ((-1, direction_bits[1]), (1, direction_bits[2]))
+                              if 0 <= col + col_offset < BOARD_SIZE))
+    return tuple(pushes), tuple(captures)
+
+
+WHITE_PAWN_PUSHES, WHITE_PAWN_CAPTURES = _pawnTargets(-1, 6, WHITE_PAWN_DIRECTION_BITS)
+BLACK_PAWN_PUSHES, BLACK_PAWN_CAPTURES = _pawnTargets(1, 1, BLACK_PAWN_DIRECTION_BITS)
+
+
+def _makePawnMoveGenerator(pushes_table, captures_table, push_bit, enemy_color):
+    """
+    Build the pawn move generator for one side.
     
-    # Check if this pawn is pinned
-    for i in range(len(game_state.pins) - 1, -1, -1):
-        if game_state.pins[i][0] == row and game_state.pins[i][1] == col:
-            piece_pinned = True
-            pin_direction = (game_state.pins[i][2], game_state.pins[i][3])
-            game_state.pins.remove(game_state.pins[i])
-            break
+    The side's tables, pin bit and enemy color are bound into the returned
+    function, so it doesn't branch on the side to move for every pawn.
     
+    Args:
+        pushes_table: The side's pawn pushes per square (see _pawnTargets)
+        captures_table: The side's pawn captures per square (see _pawnTargets)
+        push_bit: Pin mask bit of the side's pawn push
+        enemy_color: Color of the pieces the side's pawns capture
+    
+    Returns:
+        Function generating the pawn moves, called as generator(game_state, square, moves)
+    """
+    def getSidePawnMoves(game_state, start_sq, moves):
+        # Directions this pawn may move in (all of them unless it is pinned)
+        pin_mask = game_state.pins_by_square.get(start_sq, UNPINNED_MASK)
+        pushes = pushes_table[start_sq]
+        
+        board = game_state.board
+        base = start_sq | board[start_sq] << MOVED_SHIFT
+        # Pawns reaching the first or last rank promote
+        forward_sq = pushes[0]
+        if forward_sq < BOARD_SIZE or forward_sq >= BOARD_SIZE * (BOARD_SIZE - 1):
+            base |= PROMOTION_FLAG
+        
+        # Single square advance, then two squares from the starting position
+        if pin_mask & push_bit:
+            for end_sq in pushes:
+                if board[end_sq] != EMPTY_SQUARE:
+                    break
+                moves.append(base | end_sq << END_SHIFT)
+        
+        # Diagonal captures, including en passant
+        enpassant = game_state.enpassant_possible
+        for end_sq, pin_bit in captures_table[start_sq]:
+            if pin_mask & pin_bit:
+                end_piece = board[end_sq]
+                if end_piece & COLOR_MASK == enemy_color:
+                    moves.append(base | end_sq << END_SHIFT | end_piece << CAPTURED_SHIFT)
+                elif enpassant and end_sq == enpassant[0] * BOARD_SIZE + enpassant[1]:
+                    _addEnPassantIfValid(game_state, start_sq, end_sq, moves, enemy_color)
+    
+    return getSidePawnMoves
+
+
+getWhitePawnMoves = _makePawnMoveGenerator(
+    WHITE_PAWN_PUSHES, WHITE_PAWN_CAPTURES, WHITE_PAWN_DIRECTION_BITS[0], BLACK_COLOR)
+getBlackPawnMoves = _makePawnMoveGenerator(
+    BLACK_PAWN_PUSHES, BLACK_PAWN_CAPTURES, BLACK_PAWN_DIRECTION_BITS[0], WHITE_COLOR)
+
+
+def _addEnPassantIfValid(game_state, start_sq, end_sq, moves, enemy_color):
+    """
+    Add an en passant capture unless it leaves the king attacked.
+    
+    The capture empties two squares at once, which the pin masks don't
+    cover: both pawns may stand between the king and a rook on the same
+    rank, or the captured pawn may be the one blocking a check. So the
+    capture is played on the board and the king square tested directly.
+    """
+    board = game_state.board
     if game_state.white_to_move:
-        move_amount = -1
-        start_row = 6
-        enemy_color = "b"
         king_row, king_col = game_state.white_king_location
     else:
-        move_amount = 1
-        start_row = 1
-        enemy_color = "w"
         king_row, king_col = game_state.black_king_location
     
-    # Single square advance
-    if game_state.board[row + move_amount][col] == EMPTY_SQUARE:
-        if not piece_pinned or pin_direction == (move_amount, 0):
-            moves.append(Move((row, col), (row + move_amount, col), game_state.board))
-            # Two square advance from starting position
-            if row == start_row and game_state.board[row + 2 * move_amount][col] == EMPTY_SQUARE:
-                moves.append(Move((row, col), (row + 2 * move_amount, col), game_state.board))
-    
-    # Capture to the left
-    if col - 1 >= 0:
-        if not piece_pinned or pin_direction == (move_amount, -1):
-            if game_state.board[row + move_amount][col - 1][0] == enemy_color:
-                moves.append(Move((row, col), (row + move_amount, col - 1), game_state.board))
-            # En passant capture to the left
-            if (row + move_amount, col - 1) == game_state.enpassant_possible:
-                _addEnPassantIfValid(game_state, row, col, move_amount, -1, king_row, king_col, moves, enemy_color)
-    
-    # Capture to the right
-    if col + 1 <= 7:
-        if not piece_pinned or pin_direction == (move_amount, +1):
-            if game_state.board[row + move_amount][col + 1][0] == enemy_color:
-                moves.append(Move((row, col), (row + move_amount, col + 1), game_state.board))
-            # En passant capture to the right
-            if (row + move_amount, col + 1) == game_state.enpassant_possible:
-                _addEnPassantIfValid(game_state, row, col, move_amount, 1, king_row, king_col, moves, enemy_color)
-
-
-def _addEnPassantIfValid(game_state, row, col, move_amount, col_offset, king_row, king_col, moves, enemy_color):
-    """Helper function to check if en passant capture is valid (doesn't expose king)."""
-    attacking_piece = False
-    blocking_piece = False
-    
-    if king_row == row:
-        if king_col < col:
-            inside_range = range(king_col + 1, col - 1)
-            outside_range = range(col + 1, 8)
-        else:
-            inside_range = range(king_col - 1, col, -1)
-            outside_range = range(col - 2, -1, -1)
-        
-        for i in inside_range:
-            if game_state.board[row][i] != EMPTY_SQUARE:
-                blocking_piece = True
-        
-        for i in outside_range:
-            square = game_state.board[row][i]
-            if square[0] == enemy_color and (square[1] == "R" or square[1] == "Q"):
-                attacking_piece = True
-            elif square != EMPTY_SQUARE:
-                blocking_piece = True
+    # The captured pawn stands beside the capturing one, on the end column
+    captured_sq = start_sq - (start_sq & 7) + (end_sq & 7)
+    pawn = board[start_sq]
+    captured_pawn = board[captured_sq]
+    board[start_sq] = EMPTY_SQUARE
+    board[captured_sq] = EMPTY_SQUARE
+    board[end_sq] = pawn
+    king_exposed = isSquareAttacked(board, king_row, king_col, enemy_color)
+    board[end_sq] = EMPTY_SQUARE
+    board[captured_sq] = captured_pawn
+    board[start_sq] = pawn
     
-    if not attacking_piece or blocking_piece:
-        moves.append(Move((row, col), (row + move_amount, col + col_offset), game_state.board, is_enpassant_move=True))
+    if not king_exposed:
+        moves.append(start_sq | end_sq << END_SHIFT | pawn << MOVED_SHIFT |
+                     captured_pawn << CAPTURED_SHIFT | ENPASSANT_FLAG)
 
 
-def getRookMoves(game_state, row, col, moves):
-    """Get all valid rook moves (horizontal and vertical)."""
-    piece_pinned = False
-    pin_direction = ()
-    
-    for i in range(len(game_state.pins) - 1, -1, -1):
-        if game_state.pins[i][0] == row and game_state.pins[i][1] == col:
-            piece_pinned = True
-            pin_direction = (game_state.pins[i][2], game_state.pins[i][3])
-            if game_state.board[row][col][1] != "Q":
-                game_state.pins.remove(game_state.pins[i])
-            break
-    
-    directions = ((-1, 0), (0, -1), (1, 0), (0, 1))  # up, left, down, right
-    enemy_color = "b" if game_state.white_to_move else "w"
-    
-    for direction in directions:
-        for i in range(1, 8):
-            end_row = row + direction[0] * i
-            end_col = col + direction[1] * i
-            
-            if not (0 <= end_row <= 7 and 0 <= end_col <= 7):
+def _getSlidingMoves(game_state, start_sq, ray_indices, moves):
+    """
+    Get moves for a sliding piece along the given rays.
+    
+    Args:
+        game_state: Current GameState
+        start_sq: Square of the piece (row * BOARD_SIZE + col)
+        ray_indices: Indices into check_detection.DIRECTIONS / RAY_TARGETS
+        moves: List to append the moves to
+    """
+    # Directions this piece may move in (all of them unless it is pinned)
+    pin_mask = game_state.pins_by_square.get(start_sq, UNPINNED_MASK)
+    
+    enemy_color = game_state.enemy_color
+    board = game_state.board
+    base = start_sq | board[start_sq] << MOVED_SHIFT
+    
+    rays = RAY_TARGETS[start_sq]
+    
+    for j in ray_indices:
+        # A pinned piece may only move along the pin line
+        if not pin_mask & 1 << j:
+            continue
+        
+        # Squares along the ray, nearest first, already clipped to the board
+        for end_sq in rays[j]:
+            end_piece = board[end_sq]
+            if end_piece == EMPTY_SQUARE:
+                moves.append(base | end_sq << END_SHIFT)
+            elif end_piece & COLOR_MASK == enemy_color:
+                moves.append(base | end_sq << END_SHIFT | end_piece << CAPTURED_SHIFT)
+                break
+            else:
                 break
-            
-            if not piece_pinned or pin_direction == direction or pin_direction == (-direction[0], -direction[1]):
-                end_piece = game_state.board[end_row][end_col]
-                if end_piece == EMPTY_SQUARE:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
-                elif end_piece[0] == enemy_color:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
-                    break
-                else:
-                    break
 
 
-def getKnightMoves(game_state, row, col, moves):
+def getRookMoves(game_state, start_sq, moves):
+    """Get all valid rook moves (horizontal and vertical)."""
+    _getSlidingMoves(game_state, start_sq, ROOK_RAYS, moves)
+
+
+def getKnightMoves(game_state, start_sq, moves):
     """Get all valid knight moves (L-shaped, can't be pinned)."""
-    piece_pinned = False
-    
-    for i in range(len(game_state.pins) - 1, -1, -1):
-        if game_state.pins[i][0] == row and game_state.pins[i][1] == col:
-            piece_pinned = True
-            game_state.pins.remove(game_state.pins[i])
-            break
+    # A pinned knight can never stay on the pin line
+    if start_sq in game_state.pins_by_square:
+        return
     
-    knight_moves = ((-2, -1), (-2, 1), (-1, 2), (1, 2), (2, -1), (2, 1), (-1, -2), (1, -2))
-    ally_color = "w" if game_state.white_to_move else "b"
+    ally_color = game_state.ally_color
+    board = game_state.board
+    base = start_sq | board[start_sq] << MOVED_SHIFT
     
-    for move in knight_moves:
-        end_row = row + move[0]
-        end_col = col + move[1]
-        
-        if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-            if not piece_pinned:
-                end_piece = game_state.board[end_row][end_col]
-                if end_piece[0] != ally_color:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
+    # Precomputed destinations, already clipped to the board
+    for end_sq in KNIGHT_TARGETS[start_sq]:
+        end_piece = board[end_sq]
+        if end_piece & COLOR_MASK != ally_color:
+            moves.append(base | end_sq << END_SHIFT | end_piece << CAPTURED_SHIFT)
 
 
-def getBishopMoves(game_state, row, col, moves):
+def getBishopMoves(game_state, start_sq, moves):
     """Get all valid bishop moves (diagonal)."""
-    piece_pinned = False
-    pin_direction = ()
-    
-    for i in range(len(game_state.pins) - 1, -1, -1):
-        if game_state.pins[i][0] == row and game_state.pins[i][1] == col:
-            piece_pinned = True
-            pin_direction = (game_state.pins[i][2], game_state.pins[i][3])
-            game_state.pins.remove(game_state.pins[i])
-            break
-    
-    directions = ((-1, -1), (-1, 1), (1, 1), (1, -1))  # diagonals
-    enemy_color = "b" if game_state.white_to_move else "w"
-    
-    for direction in directions:
-        for i in range(1, 8):
-            end_row = row + direction[0] * i
-            end_col = col + direction[1] * i
-            
-            if not (0 <= end_row <= 7 and 0 <= end_col <= 7):
-                break
-            
-            if not piece_pinned or pin_direction == direction or pin_direction == (-direction[0], -direction[1]):
-                end_piece = game_state.board[end_row][end_col]
-                if end_piece == EMPTY_SQUARE:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
-                elif end_piece[0] == enemy_color:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
-                    break
-                else:
-                    break
+    _getSlidingMoves(game_state, start_sq, BISHOP_RAYS, moves)
 
 
-def getQueenMoves(game_state, row, col, moves):
-    """Get all valid queen moves (combination of rook and bishop)."""
-    getRookMoves(game_state, row, col, moves)
-    getBishopMoves(game_state, row, col, moves)
+def getQueenMoves(game_state, start_sq, moves):
+    """Get all valid queen moves (combination of rook and bishop), in one pass over all 8 rays."""
+    _getSlidingMoves(game_state, start_sq, QUEEN_RAYS, moves)
 
 
-def getKingMoves(game_state, row, col, moves):
+def getKingMoves(game_state, start_sq, moves):
     """Get all valid king moves (one square in any direction)."""
-    row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
-    col_moves = (-1, 0, 1, -1, 1, -1, 0, 1)
-    ally_color = "w" if game_state.white_to_move else "b"
+    ally_color = game_state.ally_color
+    enemy_color = game_state.enemy_color
+    board = game_state.board
     
-    for i in range(8):
-        end_row = row + row_moves[i]
-        end_col = col + col_moves[i]
-        
-        if 0 <= end_row <= 7 and 0 <= end_col <= 7:
-            end_piece = game_state.board[end_row][end_col]
-            if end_piece[0] != ally_color:
-                # Temporarily move king to check if square is under attack
-                if ally_color == "w":
-                    game_state.white_king_location = (end_row, end_col)
-                else:
-                    game_state.black_king_location = (end_row, end_col)
-                
-                in_check, pins, checks = game_state.checkForPinsAndChecks()
-                
-                if not in_check:
-                    moves.append(Move((row, col), (end_row, end_col), game_state.board))
-                
-                # Restore king position
-                if ally_color == "w":
-                    game_state.white_king_location = (row, col)
-                else:
-                    game_state.black_king_location = (row, col)
+    # Lift the king off the board so it can't shield squares along its own line of attack
+    king = board[start_sq]
+    board[start_sq] = EMPTY_SQUARE
+    base = start_sq | king << MOVED_SHIFT
+    
+    for end_sq in KING_TARGETS[start_sq]:
+        end_piece = board[end_sq]
+        if end_piece & COLOR_MASK != ally_color:
+            if not isSquareAttacked(board, end_sq >> 3, end_sq & 7, enemy_color):
+                moves.append(base | end_sq << END_SHIFT | end_piece << CAPTURED_SHIFT)
+    
+    board[start_sq] = king
+
+
+def getPseudoLegalKingMoves(game_state, start_sq, moves):
+    """
+    Get king moves without testing the destination squares for attacks.
+    Only for callers that reject moves leaving the king in check after making them.
+    """
+    ally_color = game_state.ally_color
+    board = game_state.board
+    base = start_sq | board[start_sq] << MOVED_SHIFT
+    
+    for end_sq in KING_TARGETS[start_sq]:
+        end_piece = board[end_sq]
+        if end_piece & COLOR_MASK != ally_color:
+            moves.append(base | end_sq << END_SHIFT | end_piece << CAPTURED_SHIFT)
+
+
+# Move generators indexed by piece code (color | type), each called as
+# generator(game_state, square, moves). Pawns get a generator per side.
+MOVE_FUNCTIONS = [None] * ((BLACK_COLOR | KING) + 1)
+MOVE_FUNCTIONS[WHITE_COLOR | PAWN] = getWhitePawnMoves
+MOVE_FUNCTIONS[BLACK_COLOR | PAWN] = getBlackPawnMoves
+for _color in (WHITE_COLOR, BLACK_COLOR):
+    MOVE_FUNCTIONS[_color | KNIGHT] = getKnightMoves
+    MOVE_FUNCTIONS[_color | BISHOP] = getBishopMoves
+    MOVE_FUNCTIONS[_color | ROOK] = getRookMoves
+    MOVE_FUNCTIONS[_color | QUEEN] = getQueenMoves
+    MOVE_FUNCTIONS[_color | KING] = getKingMoves
+
+# Same, but with king moves left for the caller to check (see GameState.getPseudoLegalMoves)
+PSEUDO_LEGAL_MOVE_FUNCTIONS = MOVE_FUNCTIONS[:]
+PSEUDO_LEGAL_MOVE_FUNCTIONS[WHITE_COLOR | KING] = getPseudoLegalKingMoves
+PSEUDO_LEGAL_MOVE_FUNCTIONS[BLACK_COLOR | KING] = getPseudoLegalKingMoves
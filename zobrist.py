@@ -0,0 +1,67 @@
+"""
+Zobrist hashing for chess positions.
+Each position is identified by a 64-bit key built by XORing random numbers
+for every piece on every square, the side to move, castling rights and
+the en passant file.
+"""
+
+import random
+from functools import reduce
+from operator import xor
+from constants import ALL_CASTLING_RIGHTS, BOARD_SIZE, EMPTY_SQUARE, PIECE_NAMES, ZOBRIST_SEED
+
+_rng = random.Random(ZOBRIST_SEED)
+
+# Random keys for each piece code on each square: PIECE_KEYS[piece][square]
+PIECE_KEYS = [None] * (max(PIECE_NAMES) + 1)
+for _piece in sorted(PIECE_NAMES):
+    if _piece != EMPTY_SQUARE:
+        PIECE_KEYS[_piece] = [_rng.getrandbits(64) for _ in range(BOARD_SIZE * BOARD_SIZE)]
+
+# XORed in when it is black to move
+SIDE_KEY = _rng.getrandbits(64)
+
+# One key per castling right (WKS, WQS, BKS, BQS), combined for each of the
+# 16 possible rights masks so a lookup replaces the per-right tests
+_CASTLE_RIGHT_KEYS = tuple(_rng.getrandbits(64) for _ in range(4))
+CASTLE_KEYS = tuple(
+    reduce(xor, (key for bit, key in enumerate(_CASTLE_RIGHT_KEYS) if rights >> bit & 1), 0)
+    for rights in range(ALL_CASTLING_RIGHTS + 1)
+)
+
+# One key per en passant file
+ENPASSANT_KEYS = tuple(_rng.getrandbits(64) for _ in range(BOARD_SIZE))
+
+
+def castleKey(castle_rights):
+    """Return the combined key for a castling rights mask."""
+    return CASTLE_KEYS[castle_rights]
+
+
+def enpassantKey(enpassant_possible):
+    """Return the key for an en passant square, or 0 if there is none."""
+    if enpassant_possible:
+        return ENPASSANT_KEYS[enpassant_possible[1]]
+    return 0
+
+
+def computeHash(game_state):
+    """
+    Compute the Zobrist key of a position from scratch.
+
+    Used to initialise the key; during play the key is updated incrementally.
+
+    Returns:
+        int: 64-bit position key
+    """
+    key = 0
+    for square, piece in enumerate(game_state.board):
+        if piece != EMPTY_SQUARE:
+            key ^= PIECE_KEYS[piece][square]
+
+    if not game_state.white_to_move:
+        key ^= SIDE_KEY
+
+    key ^= castleKey(game_state.current_castling_rights)
+    key ^= enpassantKey(game_state.enpassant_possible)
+    return key